@@ -1,49 +1,183 @@
 import streamlit as st
 import pandas as pd
-import ifcopenshell.util.element as Element
+import numpy as np
+from model_cache import model_cache, file_content_hash
 import plotly.express as px
 import plotly.graph_objects as go
 import logging
-from collections import defaultdict
+from collections import OrderedDict
+from concurrent.futures import wait
 from datetime import datetime
-from reportlab.lib.pagesizes import letter
-from reportlab.lib import colors
-from reportlab.lib.styles import getSampleStyleSheet
-from reportlab.platypus import SimpleDocTemplate, Paragraph, Spacer, Table, TableStyle, Image
-from reportlab.lib.units import inch
-import tempfile
-
-def display_metadata(ifc_file):
-    project = ifc_file.by_type('IfcProject')
-    if project:
-        project = project[0]
-        st.write("### Project Metadata")
-        st.write(f"Name: {project.Name}")
-        st.write(f"Description: {project.Description}")
-        st.write(f"Phase: {project.Phase}")
-        if hasattr(project, 'CreationDate'):
-            st.write(f"Time Stamp: {datetime.fromtimestamp(project.CreationDate)}")
-        else:
-            st.write("Time Stamp: Not available")
+import io
+from tracing import trace_stage, traced
+from jobs import JobCancelled
+from utils import plotly_chart, run_file_job
+from chart_data import histogram, top_n_counts, lttb_downsample
+
+KEY_INDEX_LIMIT = 4
+JOB_POLL_SECONDS = 0.5
+
+def _open_model(job, file_hash, file_path):
+    job.report(stage="Parsing IFC file")
+    ifc_file = model_cache.get_or_open(file_hash, file_path)
+    # Parsing cannot be interrupted, so honour a cancel that came in meanwhile.
+    job.report()
+    return ifc_file
+
+def _model_opener(job, file_path, file_hash, stage=None):
+    # Passed to the loaders, which only open the model if their result is not stored yet.
+    def open_model():
+        ifc_file = _open_model(job, file_hash, file_path)
+        if stage is not None:
+            job.report(stage=stage)
+        return ifc_file
+    return open_model
+
+def _load_model_summary_job(job, file_path, file_hash):
+    import analysis_core
+    return analysis_core.load_model_summary(file_hash, _model_opener(job, file_path, file_hash))
+
+def _load_products_dataframe_job(job, file_path, file_hash):
+    import analysis_core
+    return analysis_core.load_products_dataframe(file_hash, _model_opener(job, file_path, file_hash, "Extracting objects"), job.report)
+
+def _load_geometry_quantities_job(job, file_path, file_hash):
+    import analysis_core
+    return analysis_core.load_geometry_quantities(file_hash, _model_opener(job, file_path, file_hash, "Computing geometry"), job.report)
 
-def count_building_components(ifc_file):
-    component_count = defaultdict(int)
+def _load_revision_job(job, file_path, file_hash):
+    import analysis_core
+    import model_diff
+    # Counts and fingerprints are stored by content hash, so a revision is processed only once.
+    open_model = _model_opener(job, file_path, file_hash)
+    summary = analysis_core.load_model_summary(file_hash, open_model)
+    job.report(stage="Fingerprinting elements")
+    model_diff.load_fingerprints(file_hash, open_model)
+    return summary
+
+def _wait_for_process(job, future):
+    # The worker process cannot be interrupted; a cancel only drops a task that has not started yet.
+    while not wait([future], timeout=JOB_POLL_SECONDS).done:
+        try:
+            job.report()
+        except JobCancelled:
+            future.cancel()
+            raise
+    return future.result()
+
+def _load_fingerprints_job(job, file_path, file_hash):
+    import model_diff
+    fingerprints = model_diff.load_fingerprints(file_hash)
+    if fingerprints is not None:
+        return fingerprints
+    if file_hash in model_cache:
+        # Parsed already for another page, so fingerprinting it here is cheaper than parsing it again.
+        return model_diff.load_fingerprints(file_hash, _model_opener(job, file_path, file_hash, "Fingerprinting elements"))
+    # Otherwise parse and fingerprint in a worker process, so both models of a comparison are done in parallel.
+    job.report(stage="Parsing and fingerprinting")
+    with trace_stage("fingerprint_in_process", file_hash=file_hash[:12]):
+        fingerprints = _wait_for_process(job, model_diff.fingerprint_in_process(file_path))
+    model_diff.save_fingerprints(file_hash, fingerprints)
+    return fingerprints
+
+def _run_model_job(file_path, key_prefix, description, job_func):
+    # Returns None while the job is still running in the background, and if it failed.
     try:
-        for ifc_entity in ifc_file.by_type('IfcProduct'):
-            component_count[ifc_entity.is_a()] += 1
+        file_hash = file_content_hash(file_path)
+        return run_file_job(f"{key_prefix}_{file_hash}", description, file_path, job_func, file_hash)
     except Exception as e:
-        error_message = f"Error processing IFC file: {e}"
+        error_message = f"Error {description[0].lower()}{description[1:]}: {e}"
         logging.error(error_message)
         st.error(error_message)
-    return component_count
+        return None
+
+def load_fingerprints(file_path):
+    return _run_model_job(file_path, "fingerprints", "Fingerprinting elements", _load_fingerprints_job)
+
+def load_revision(file_path):
+    summary = _run_model_job(file_path, "revision", "Processing revision", _load_revision_job)
+    return (file_content_hash(file_path), summary) if summary is not None else None
+
+def load_model_summary(file_path):
+    return _run_model_job(file_path, "summary", "Processing IFC file", _load_model_summary_job)
+
+def load_products_dataframe(file_path):
+    return _run_model_job(file_path, "products", "Extracting objects", _load_products_dataframe_job)
 
-def detailed_analysis(ifc_file, product_type, sort_by=None):
-    product_count = defaultdict(int)
+def load_geometry_quantities(file_path):
+    return _run_model_job(file_path, "geometry", "Computing geometry quantities", _load_geometry_quantities_job)
+
+@traced("export_objects")
+def export_objects(dataframe, export_path, table_format):
+    from extraction import BASE_COLUMNS, iter_dataframe_chunks
+    from table_io import write_table_stream
+    return write_table_stream(iter_dataframe_chunks(dataframe), export_path, table_format, BASE_COLUMNS)
+
+@traced("export_reconciliation")
+def export_reconciliation(result, export_path, table_format='csv'):
+    from extraction import iter_dataframe_chunks
+    from table_io import write_table_stream
+    return write_table_stream(iter_dataframe_chunks(result), export_path, table_format, result.columns.tolist())
+
+def filter_products(file_path, objects, classes, levels, geometry=None):
+    import analysis_core
+    # The filtered table is kept for the session, so paging and sorting do not filter again.
+    signature = (file_content_hash(file_path), tuple(classes), tuple(levels), geometry is not None)
+    cached = st.session_state.get('filtered_products')
+    if cached is None or cached[0] != signature:
+        with trace_stage("filter_objects", classes=len(classes), levels=len(levels)):
+            filtered = analysis_core.filter_objects(objects, classes, levels)
+            if geometry is not None:
+                from geometry_quantities import add_geometry_quantities
+                filtered = add_geometry_quantities(filtered, geometry)
+        cached = (signature, filtered)
+        st.session_state.filtered_products = cached
+    return cached[1]
+
+def reconcile_schedule(excel_path, sheet_name, schedule, schedule_key, ifc_path, objects, model_key, column_pairs, rtol):
+    """Join result of the schedule and the model, and the signature identifying it.
+
+    The result is kept for the session, so paging, sorting and filtering its table do not join again.
+    """
+    import schedule_join
+    schedule_hash, model_hash = file_content_hash(excel_path), file_content_hash(ifc_path)
+    signature = (schedule_hash, sheet_name, model_hash, schedule_key, model_key, tuple(column_pairs), rtol)
+    cached = st.session_state.get('schedule_reconciliation')
+    if cached is None or cached[0] != signature:
+        schedule_index = get_key_index(('schedule', schedule_hash, sheet_name), schedule, schedule_key)
+        model_index = get_key_index(('model', model_hash), objects, model_key)
+        with trace_stage("join_schedule", rows=len(schedule), objects=len(objects), columns=len(column_pairs)):
+            result = schedule_join.join_schedule(schedule, schedule_index, objects, model_index, column_pairs, rtol)
+        cached = (signature, result)
+        st.session_state.schedule_reconciliation = cached
+    return cached
+
+def get_key_index(cache_key, frame, key):
+    # Key indexes are kept per session, so changing the compared columns or tolerance does not rebuild them.
+    from schedule_join import KeyIndex
+    indexes = st.session_state.setdefault('key_indexes', OrderedDict())
+    index = indexes.get((cache_key, key))
+    if index is None or index.length != len(frame):
+        with trace_stage("build_key_index", key=key, rows=len(frame)):
+            index = KeyIndex(frame, key)
+        indexes[(cache_key, key)] = index
+        while len(indexes) > KEY_INDEX_LIMIT:
+            indexes.popitem(last=False)
+    indexes.move_to_end((cache_key, key))
+    return index
+
+def display_metadata(metadata):
+    if metadata:
+        st.write("### Project Metadata")
+        st.write(f"Name: {metadata['Name']}")
+        st.write(f"Description: {metadata['Description']}")
+        st.write(f"Phase: {metadata['Phase']}")
+        st.write(f"Time Stamp: {metadata['CreationDate']}")
+
+def detailed_analysis(model_summary, product_type, sort_by=None):
+    product_count = {}
     try:
-        for product in ifc_file.by_type(product_type):
-            product_name = product.Name if product.Name else "Unnamed"
-            type_name = product_name.split(':')[0] if product_name else "Unnamed"
-            product_count[type_name] += 1
+        product_count = model_summary.count_by_name_prefix(product_type)
     except Exception as e:
         error_message = f"Error during detailed analysis: {e}"
         logging.error(error_message)
@@ -54,7 +188,7 @@ def detailed_analysis(ifc_file, product_type, sort_by=None):
     if values:
         fig = px.pie(values=values, names=labels, title=f"Distribution of {product_type} Products by Type")
         fig.update_layout(paper_bgcolor='white', plot_bgcolor='white', font_color='black')
-        st.plotly_chart(fig)
+        plotly_chart(fig)
 
         if sort_by:
             df = pd.DataFrame({'Type': labels, 'Count': values}).sort_values(by=sort_by, ascending=False)
@@ -75,10 +209,38 @@ def generate_insights(df):
     if not df.empty:
         st.write("Descriptive Statistics:", df.describe())
 
-def export_analysis_to_pdf(ifc_metadata, component_count, figs, author, subject, cover_text):
-    buffer = tempfile.NamedTemporaryFile(delete=False, suffix=".pdf")
-    doc = SimpleDocTemplate(buffer.name, pagesize=letter)
+def _pdf_table_style():
+    from reportlab.lib import colors
+    from reportlab.platypus import TableStyle
+    return TableStyle([
+        ('BACKGROUND', (0, 0), (-1, 0), colors.grey),
+        ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
+        ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
+        ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
+        ('BOTTOMPADDING', (0, 0), (-1, 0), 12),
+        ('BACKGROUND', (0, 1), (-1, -1), colors.beige),
+    ])
+
+def _scaled_image(png, max_width):
+    from reportlab.lib.utils import ImageReader
+    from reportlab.platypus import Image
+    image_width, image_height = ImageReader(io.BytesIO(png)).getSize()
+    scale = min(1.0, max_width / image_width)
+    return Image(io.BytesIO(png), width=image_width * scale, height=image_height * scale)
+
+@traced("export_pdf")
+def export_analysis_to_pdf(ifc_metadata, component_count, figs, author, subject, cover_text, tables=None):
+    # reportlab and the kaleido renderer are only loaded when a report is actually exported.
+    from reportlab.lib.pagesizes import letter
+    from reportlab.lib.styles import getSampleStyleSheet
+    from reportlab.platypus import SimpleDocTemplate, Paragraph, Spacer, Table, LongTable
+    from reportlab.lib.units import inch
+    from chart_rendering import render_figures
+
+    buffer = io.BytesIO()
+    doc = SimpleDocTemplate(buffer, pagesize=letter)
     styles = getSampleStyleSheet()
+    table_style = _pdf_table_style()
     flowables = []
 
     # Cover Page
@@ -100,113 +262,89 @@ def export_analysis_to_pdf(ifc_metadata, component_count, figs, author, subject,
         ["Creation Date", ifc_metadata.get('CreationDate', 'Not available')]
     ]
     metadata_table = Table(metadata_table_data)
-    metadata_table.setStyle(TableStyle([
-        ('BACKGROUND', (0, 0), (-1, 0), colors.grey),
-        ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
-        ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
-        ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
-        ('BOTTOMPADDING', (0, 0), (-1, 0), 12),
-        ('BACKGROUND', (0, 1), (-1, -1), colors.beige),
-    ]))
+    metadata_table.setStyle(table_style)
     flowables.append(metadata_table)
     flowables.append(Spacer(1, 0.5 * inch))
 
     # Component Count
     flowables.append(Paragraph("Component Count", styles['Heading2']))
     component_table_data = [["Component", "Count"]] + [[component, str(count)] for component, count in component_count.items()]
-    component_table = Table(component_table_data)
-    component_table.setStyle(TableStyle([
-        ('BACKGROUND', (0, 0), (-1, 0), colors.grey),
-        ('TEXTCOLOR', (0, 0), (-1, 0), colors.whitesmoke),
-        ('ALIGN', (0, 0), (-1, -1), 'CENTER'),
-        ('FONTNAME', (0, 0), (-1, 0), 'Helvetica-Bold'),
-        ('BOTTOMPADDING', (0, 0), (-1, 0), 12),
-        ('BACKGROUND', (0, 1), (-1, -1), colors.beige),
-    ]))
+    component_table = LongTable(component_table_data, repeatRows=1)
+    component_table.setStyle(table_style)
     flowables.append(component_table)
     flowables.append(Spacer(1, 0.5 * inch))
 
+    # Additional tables, given as (title, DataFrame) pairs
+    for title, table_df in tables or []:
+        flowables.append(Paragraph(title, styles['Heading2']))
+        table = LongTable([list(map(str, table_df.columns))] + table_df.astype(str).values.tolist(), repeatRows=1)
+        table.setStyle(table_style)
+        flowables.append(table)
+        flowables.append(Spacer(1, 0.5 * inch))
+
     # Adding Images
-    for idx, fig in enumerate(figs):
-        with tempfile.NamedTemporaryFile(delete=False, suffix='.png') as tmp_file:
-            try:
-                fig.update_layout(paper_bgcolor='white', plot_bgcolor='white', font_color='black')
-                fig.write_image(tmp_file.name, format='png', engine='kaleido')
-                flowables.append(Spacer(1, 0.5 * inch))
-                flowables.append(Paragraph(f"Chart {idx + 1}", styles['Heading2']))
-                flowables.append(Image(tmp_file.name))
-            except Exception as e:
-                logging.error(f"Error exporting chart to image: {e}")
-                st.error(f"Error exporting chart to image: {e}")
+    for idx, png in enumerate(render_figures(figs)):
+        if isinstance(png, Exception):
+            logging.error(f"Error exporting chart to image: {png}")
+            st.error(f"Error exporting chart to image: {png}")
+            continue
+        flowables.append(Spacer(1, 0.5 * inch))
+        flowables.append(Paragraph(f"Chart {idx + 1}", styles['Heading2']))
+        flowables.append(_scaled_image(png, doc.width))
 
     doc.build(flowables)
-    return buffer.name
-def compare_ifc_files(ifc_file1, ifc_file2):
-    components1 = count_building_components(ifc_file1)
-    components2 = count_building_components(ifc_file2)
-
-    comparison_result = defaultdict(dict)
-    all_component_types = set(components1.keys()) | set(components2.keys())
-
-    for component_type in all_component_types:
-        count1 = components1.get(component_type, 0)
-        count2 = components2.get(component_type, 0)
-        comparison_result[component_type]['File 1 Count'] = count1
-        comparison_result[component_type]['File 2 Count'] = count2
-        comparison_result[component_type]['Difference'] = count1 - count2
-
-    return comparison_result
-
-def get_objects_data_by_class(file, class_type):
-    def add_pset_attributes(psets):
-        for pset_name, pset_data in psets.items():
-            for property_name in pset_data.keys():
-                pset_attributes.add(f'{pset_name}.{property_name}')
-    
-    pset_attributes = set()
-    objects_data = []
-    objects = file.by_type(class_type)
-      
-    for obj in objects:
-        psets = Element.get_psets(obj, psets_only=True)
-        add_pset_attributes(psets)
-        qtos = Element.get_psets(obj, qtos_only=True)
-        add_pset_attributes(qtos)
-        objects_data.append({
-            "ExpressId": obj.id(),
-            "GlobalId": getattr(obj, 'GlobalId', None),
-            "Class": obj.is_a(),
-            "PredefinedType": Element.get_predefined_type(obj),
-            "Name": getattr(obj, 'Name', None),
-            "Level": Element.get_container(obj).Name if Element.get_container(obj) else "",
-            "Type": Element.get_type(obj).Name if Element.get_type(obj) else "",
-            "QuantitySets": qtos,
-            "PropertySets": psets,
-        })
-    return objects_data, list(pset_attributes)
-
-def get_attribute_value(object_data, attribute):
-    if "." not in attribute:
-        return object_data.get(attribute, None)
-    elif "." in attribute:
-        pset_name, prop_name = attribute.split(".", 1)
-        if pset_name in object_data["PropertySets"]:
-            return object_data["PropertySets"][pset_name].get(prop_name, None)
-        if pset_name in object_data["QuantitySets"]:
-            return object_data["QuantitySets"][pset_name].get(prop_name, None)
-    return None
-
-def visualize_data(df, columns):
+    return buffer.getvalue()
+
+def compare_ifc_elements(file_path1, file_path2):
+    # Returns None while either model is still being fingerprinted in the background.
+    import model_diff
+    old, new = load_fingerprints(file_path1), load_fingerprints(file_path2)
+    if old is None or new is None:
+        return None
+    try:
+        with trace_stage("diff_fingerprints", elements=len(old) + len(new)):
+            return model_diff.diff_fingerprints(old, new)
+    except Exception as e:
+        error_message = f"Error comparing IFC elements: {e}"
+        logging.error(error_message)
+        st.error(error_message)
+        return None
+
+def visualize_element_diff(diff_summary, title, x='Class', xaxis_title="Component Type"):
+    # Added, removed and modified elements stacked per row of diff_summary, e.g. per class or per revision step.
+    fig = go.Figure(data=[
+        go.Bar(name='Added', x=diff_summary[x], y=diff_summary['Added'], marker_color='lightseagreen'),
+        go.Bar(name='Removed', x=diff_summary[x], y=diff_summary['Removed'], marker_color='indianred'),
+        go.Bar(name='Modified', x=diff_summary[x], y=diff_summary['Modified'], marker_color='goldenrod'),
+    ])
+    fig.update_layout(barmode='stack', title_text=title, xaxis_title=xaxis_title, yaxis_title="Elements", paper_bgcolor='white', plot_bgcolor='white', font_color='black')
+    return fig
+
+def visualize_class_trends(counts, classes, title):
+    fig = go.Figure(data=[
+        go.Scatter(name=ifc_class, x=counts.columns.tolist(), y=counts.loc[ifc_class].tolist(), mode='lines+markers')
+        for ifc_class in classes
+    ])
+    fig.update_layout(title_text=title, xaxis_title="Revision", yaxis_title="Elements", paper_bgcolor='white', plot_bgcolor='white', font_color='black')
+    return fig
+
+def visualize_data(df, columns, chart_style='Distribution'):
     figs = []
     for column in columns:
-        if pd.api.types.is_numeric_dtype(df[column]):
-            fig = px.histogram(df, x=column)
-            fig.update_layout(paper_bgcolor='white', plot_bgcolor='white', font_color='black')
-            st.plotly_chart(fig)
-            figs.append(fig)
+        values = df[column]
+        if chart_style == 'Series' and pd.api.types.is_numeric_dtype(values):
+            x, y = lttb_downsample(np.arange(len(values)), values.to_numpy(dtype=float, na_value=np.nan))
+            fig = go.Figure(data=[go.Scatter(x=x, y=y, mode='lines')])
+            fig.update_layout(title_text=f"Series of {column}" + (f" ({len(x):,} of {len(values):,} points)" if len(x) < len(values) else ""), xaxis_title="Row", yaxis_title=column)
+        elif pd.api.types.is_numeric_dtype(values) and not pd.api.types.is_bool_dtype(values):
+            counts, edges = histogram(values)
+            fig = go.Figure(data=[go.Bar(x=(edges[:-1] + edges[1:]) / 2, y=counts, width=np.diff(edges))])
+            fig.update_layout(title_text=f"Histogram of {column}", xaxis_title=column, yaxis_title="count", bargap=0)
         else:
-            fig = px.bar(df, x=column, title=f"Bar chart of {column}")
-            fig.update_layout(paper_bgcolor='white', plot_bgcolor='white', font_color='black')
-            st.plotly_chart(fig)
-            figs.append(fig)
+            counts = top_n_counts(values)
+            fig = go.Figure(data=[go.Bar(x=counts.index.astype(str), y=counts.to_numpy())])
+            fig.update_layout(title_text=f"Bar chart of {column}", xaxis_title=column, yaxis_title="count")
+        fig.update_layout(paper_bgcolor='white', plot_bgcolor='white', font_color='black')
+        plotly_chart(fig)
+        figs.append(fig)
     return figs
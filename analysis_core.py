@@ -0,0 +1,102 @@
+# Streamlit-free analysis functions shared by the app (through analysis.py) and the batch CLI.
+from collections import defaultdict
+
+from analysis_store import analysis_store
+from tracing import trace_stage
+from model_index import get_model_index
+from extraction import extract_objects, extract_objects_dataframe, sparsify_pset_columns, drop_empty_pset_columns
+from geometry_quantities import GEOMETRY_SUM_COLUMNS, compute_geometry_quantities
+
+PRODUCTS_TABLE = 'IfcProduct'
+
+
+def get_ifc_metadata(ifc_file):
+    return dict(get_model_index(ifc_file).project_metadata)
+
+
+def count_building_components(ifc_file):
+    component_count = defaultdict(int)
+    component_count.update(get_model_index(ifc_file).component_count)
+    return component_count
+
+
+def compare_component_counts(components1, components2):
+    comparison_result = defaultdict(dict)
+    all_component_types = set(components1.keys()) | set(components2.keys())
+
+    for component_type in all_component_types:
+        count1 = components1.get(component_type, 0)
+        count2 = components2.get(component_type, 0)
+        comparison_result[component_type]['File 1 Count'] = count1
+        comparison_result[component_type]['File 2 Count'] = count2
+        comparison_result[component_type]['Difference'] = count1 - count2
+
+    return comparison_result
+
+
+def compare_ifc_files(ifc_file1, ifc_file2):
+    return compare_component_counts(count_building_components(ifc_file1), count_building_components(ifc_file2))
+
+
+def get_objects_data_by_class(file, class_type):
+    return extract_objects(file, file.by_type(class_type))
+
+
+def get_objects_dataframe_by_class(file, class_type, progress=None):
+    return extract_objects_dataframe(file, file.by_type(class_type), progress)
+
+
+def summarize_by_level_and_type(dataframe):
+    grouped = dataframe.groupby(['Level', 'Type'], observed=True)
+    summary = grouped.size().reset_index(name='Count')
+    quantity_columns = [column for column in GEOMETRY_SUM_COLUMNS if column in dataframe.columns]
+    if quantity_columns:
+        summary = summary.merge(grouped[quantity_columns].sum(min_count=1).reset_index(), on=['Level', 'Type'])
+    return summary
+
+
+def load_model_summary(file_hash, open_model):
+    # open_model is only called when the store has nothing for this file.
+    with trace_stage("store_load_summary") as span:
+        summary = analysis_store.load_summary(file_hash)
+        span["hit"] = summary is not None
+    if summary is None:
+        ifc_file = open_model()
+        with trace_stage("model_index"):
+            summary = get_model_index(ifc_file).summary()
+        analysis_store.save_summary(file_hash, summary)
+    return summary
+
+
+def load_products_dataframe(file_hash, open_model, progress=None):
+    # All products in one table, extracted once per model; classes and levels are then filtered in memory.
+    with trace_stage("store_load_objects", class_type=PRODUCTS_TABLE) as span:
+        objects = analysis_store.load_table(file_hash, 'objects', PRODUCTS_TABLE)
+        span["hit"] = objects is not None
+    if objects is None:
+        objects = get_objects_dataframe_by_class(open_model(), PRODUCTS_TABLE, progress)
+        analysis_store.save_table(file_hash, 'objects', PRODUCTS_TABLE, objects)
+    with trace_stage("sparsify_objects", columns=len(objects.columns)):
+        return sparsify_pset_columns(objects)
+
+
+def load_geometry_quantities(file_hash, open_model, progress=None):
+    with trace_stage("store_load_geometry") as span:
+        geometry = analysis_store.load_table(file_hash, 'geometry', PRODUCTS_TABLE)
+        span["hit"] = geometry is not None
+    if geometry is None:
+        geometry = compute_geometry_quantities(open_model(), progress=progress)
+        analysis_store.save_table(file_hash, 'geometry', PRODUCTS_TABLE, geometry)
+    return geometry
+
+
+def filter_objects(objects, classes=None, levels=None):
+    mask = None
+    if classes:
+        mask = objects['Class'].isin(classes)
+    if levels:
+        level_mask = objects['Level'].isin(levels)
+        mask = level_mask if mask is None else mask & level_mask
+    filtered = objects if mask is None else objects[mask]
+    # Still sparse; table views and exports densify only the rows they show or write.
+    return drop_empty_pset_columns(filtered.reset_index(drop=True))
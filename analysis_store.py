@@ -0,0 +1,146 @@
+import hashlib
+import json
+import logging
+import os
+import shutil
+import tempfile
+import threading
+from datetime import datetime
+
+import pandas as pd
+
+from model_index import ModelSummary
+from table_io import write_table
+from version import __version__
+
+STORE_DIR = os.environ.get('IFC_TOOL_STORE_DIR', os.path.join(tempfile.gettempdir(), 'ifc_analysis_tool_cache', 'store'))
+STORE_MAX_MB = int(os.environ.get('IFC_TOOL_STORE_MAX_MB', 4096))
+
+
+def _table_name(name):
+    # Class names are safe file names, but keep arbitrary keys from escaping the entry directory.
+    return hashlib.sha256(name.encode('utf-8')).hexdigest()[:16] + '.parquet'
+
+
+class AnalysisStore:
+    """Derived analysis results on disk, one directory per model content hash and tool version.
+
+    Entries are plain Parquet/JSON files, so a known model is served without
+    parsing the IFC file. The least recently used entries are removed once the
+    store grows past ``max_mb``.
+    """
+
+    def __init__(self, root=STORE_DIR, max_mb=STORE_MAX_MB, version=__version__):
+        self.root = root
+        self.max_mb = max_mb
+        self.version = version
+        self._lock = threading.Lock()
+
+    def _entry_dir(self, file_hash):
+        return os.path.join(self.root, f'{file_hash}-v{self.version}')
+
+    def _path(self, file_hash, *parts):
+        return os.path.join(self._entry_dir(file_hash), *parts)
+
+    def _touch(self, file_hash):
+        try:
+            os.utime(self._entry_dir(file_hash))
+        except OSError:
+            pass
+
+    def _write(self, path, write):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        tmp_path = f'{path}.{os.getpid()}.{threading.get_ident()}.tmp'
+        write(tmp_path)
+        os.replace(tmp_path, path)
+
+    def _read_table(self, path):
+        if not os.path.exists(path):
+            return None
+        return pd.read_parquet(path, memory_map=True)
+
+    def _write_table(self, path, dataframe):
+        self._write(path, lambda tmp_path: write_table(dataframe, tmp_path, 'parquet'))
+
+    def load_summary(self, file_hash):
+        path = self._path(file_hash, 'summary.json')
+        if not os.path.exists(path):
+            return None
+        try:
+            with open(path) as f:
+                data = json.load(f)
+        except (OSError, ValueError) as e:
+            logging.warning(f"Ignoring unreadable analysis store entry {path}: {e}")
+            return None
+        self._touch(file_hash)
+        return ModelSummary(
+            data["project_metadata"],
+            data["component_count"],
+            data["name_prefix_counts"],
+            data["subclasses"],
+        )
+
+    def save_summary(self, file_hash, summary):
+        data = {
+            "project_metadata": {key: value.isoformat(sep=' ') if isinstance(value, datetime) else value for key, value in summary.project_metadata.items()},
+            "component_count": dict(summary.component_count),
+            "name_prefix_counts": {ifc_class: dict(counts) for ifc_class, counts in summary.name_prefix_counts.items()},
+            "subclasses": summary.subclasses,
+        }
+
+        def write(tmp_path):
+            with open(tmp_path, 'w') as f:
+                json.dump(data, f)
+        self._write(self._path(file_hash, 'summary.json'), write)
+        self.evict()
+
+    def load_table(self, file_hash, kind, name):
+        table = self._read_table(self._path(file_hash, kind, _table_name(name)))
+        if table is not None:
+            self._touch(file_hash)
+        return table
+
+    def save_table(self, file_hash, kind, name, dataframe):
+        self._write_table(self._path(file_hash, kind, _table_name(name)), dataframe)
+        self.evict()
+
+    @staticmethod
+    def _size(dir_path):
+        # Job threads write *.tmp files and rename them outside the lock, so files can vanish while being counted.
+        size = 0
+        for walk_path, _, file_names in os.walk(dir_path):
+            for name in file_names:
+                if name.endswith('.tmp'):
+                    continue
+                try:
+                    size += os.path.getsize(os.path.join(walk_path, name))
+                except OSError:
+                    pass
+        return size
+
+    def _entries(self):
+        entries = []
+        for entry in os.scandir(self.root):
+            try:
+                if entry.is_dir(follow_symlinks=False):
+                    entries.append((entry.stat().st_mtime, self._size(entry.path), entry.path))
+            except OSError:
+                continue
+        return sorted(entries)
+
+    def evict(self):
+        if not os.path.isdir(self.root):
+            return
+        with self._lock:
+            entries = self._entries()
+            total = sum(size for _, size, _ in entries)
+            # The newest entry is kept even if it alone exceeds the budget.
+            for _, size, path in entries[:-1]:
+                if total <= self.max_mb * 1024 * 1024:
+                    break
+                logging.info(f"Evicting analysis store entry {os.path.basename(path)}")
+                shutil.rmtree(path, ignore_errors=True)
+                total -= size
+
+
+analysis_store = AnalysisStore()
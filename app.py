@@ -1,7 +1,34 @@
 import streamlit as st
-from pages import welcome_page, ifc_file_analysis, excel_file_analysis, compare_ifc_files_ui, display_detailed_object_data
+import logging
+import os
+import time
+import uuid
+import psutil
+from pages import welcome_page, ifc_file_analysis, excel_file_analysis, compare_ifc_files_ui, revision_timeline_ui, display_detailed_object_data, schedule_reconciliation_ui, diagnostics_panel
+from tracing import Trace, activate_trace, trace_stage
+from utils import run_janitor
+
+# Seconds from process start to the first rendered page; a warning is logged when a cold start exceeds it.
+STARTUP_BUDGET_SECONDS = float(os.environ.get('IFC_TOOL_STARTUP_BUDGET_SECONDS', 3.0))
+_first_render_logged = False
+
+def log_cold_start():
+    global _first_render_logged
+    if _first_render_logged:
+        return
+    _first_render_logged = True
+    startup_seconds = time.time() - psutil.Process().create_time()
+    message = f"Cold start: first page rendered {startup_seconds:.2f}s after process start (budget {STARTUP_BUDGET_SECONDS:.2f}s)"
+    if startup_seconds > STARTUP_BUDGET_SECONDS:
+        logging.warning(message)
+    else:
+        logging.info(message)
 
 def main():
+    if 'perf_trace' not in st.session_state:
+        st.session_state.perf_trace = Trace(session_id=uuid.uuid4().hex[:12])
+    activate_trace(st.session_state.perf_trace)
+    run_janitor()
     st.sidebar.title("Navigation")
     if st.sidebar.button("Home"):
         st.session_state.analysis_choice = "Welcome"
@@ -11,22 +38,37 @@ def main():
         st.session_state.analysis_choice = "Analyze Excel File"
     if st.sidebar.button("Compare IFC Files"):
         st.session_state.analysis_choice = "Compare IFC Files"
+    if st.sidebar.button("Revision Timeline"):
+        st.session_state.analysis_choice = "Revision Timeline"
     if st.sidebar.button("Detailed Object Data"):
         st.session_state.analysis_choice = "Detailed Object Data"
+    if st.sidebar.button("Reconcile Schedule"):
+        st.session_state.analysis_choice = "Reconcile Schedule"
 
     if 'analysis_choice' not in st.session_state:
         st.session_state.analysis_choice = "Welcome"
 
-    if st.session_state.analysis_choice == "Welcome":
-        welcome_page()
-    elif st.session_state.analysis_choice == "Analyze IFC File":
-        ifc_file_analysis()
-    elif st.session_state.analysis_choice == "Analyze Excel File":
-        excel_file_analysis()
-    elif st.session_state.analysis_choice == "Compare IFC Files":
-        compare_ifc_files_ui()
-    elif st.session_state.analysis_choice == "Detailed Object Data":
-        display_detailed_object_data()
+    show_diagnostics = st.sidebar.checkbox("Show diagnostics", key="show_diagnostics")
+
+    with trace_stage("page_run", page=st.session_state.analysis_choice):
+        if st.session_state.analysis_choice == "Welcome":
+            welcome_page()
+        elif st.session_state.analysis_choice == "Analyze IFC File":
+            ifc_file_analysis()
+        elif st.session_state.analysis_choice == "Analyze Excel File":
+            excel_file_analysis()
+        elif st.session_state.analysis_choice == "Compare IFC Files":
+            compare_ifc_files_ui()
+        elif st.session_state.analysis_choice == "Revision Timeline":
+            revision_timeline_ui()
+        elif st.session_state.analysis_choice == "Detailed Object Data":
+            display_detailed_object_data()
+        elif st.session_state.analysis_choice == "Reconcile Schedule":
+            schedule_reconciliation_ui()
+
+    if show_diagnostics:
+        diagnostics_panel(st.session_state.perf_trace)
+    log_cold_start()
 
 if __name__ == "__main__":
     main()
@@ -0,0 +1,117 @@
+"""Analyze a directory of IFC files without the Streamlit app.
+
+Example:
+    python batch.py models/ --output results/ --format parquet --workers 8
+"""
+import argparse
+import json
+import logging
+import os
+import sys
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+import pandas as pd
+
+from table_io import TABLE_FORMATS, write_table, write_table_stream
+
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+
+
+def find_ifc_files(input_dir, recursive=False):
+    if not recursive:
+        return sorted(
+            os.path.join(input_dir, name) for name in os.listdir(input_dir)
+            if name.lower().endswith('.ifc') and os.path.isfile(os.path.join(input_dir, name))
+        )
+    ifc_files = []
+    for root, _, names in os.walk(input_dir):
+        ifc_files.extend(os.path.join(root, name) for name in names if name.lower().endswith('.ifc'))
+    return sorted(ifc_files)
+
+
+def analyze_ifc_file(file_path, output_dir, table_format='csv', class_types=None):
+    # Runs in a worker process; imports stay local so the parent does not load ifcopenshell.
+    import ifcopenshell
+    from analysis_core import count_building_components, get_ifc_metadata
+    from extraction import BASE_COLUMNS, iter_object_frames
+
+    started = time.perf_counter()
+    stem = os.path.splitext(os.path.basename(file_path))[0]
+    ifc_file = ifcopenshell.open(file_path)
+
+    metadata = {"File": os.path.basename(file_path), **get_ifc_metadata(ifc_file)}
+    component_count = count_building_components(ifc_file)
+    counts = pd.DataFrame(
+        [(os.path.basename(file_path), component, count) for component, count in sorted(component_count.items())],
+        columns=["File", "Component", "Count"],
+    )
+
+    elements = []
+    for class_type in class_types or ['IfcProduct']:
+        elements.extend(ifc_file.by_type(class_type))
+    # Streamed in chunks, so memory does not grow with the number of objects.
+    object_count = write_table_stream(iter_object_frames(ifc_file, elements), os.path.join(output_dir, f'{stem}.objects.{table_format}'), table_format, BASE_COLUMNS)
+
+    return {
+        "metadata": metadata,
+        "counts": counts,
+        "elements": object_count,
+        "seconds": round(time.perf_counter() - started, 3),
+    }
+
+
+def run_batch(input_dir, output_dir, table_format='csv', workers=None, class_types=None, recursive=False):
+    ifc_files = find_ifc_files(input_dir, recursive)
+    if not ifc_files:
+        logging.warning(f"No IFC files found in {input_dir}")
+        return []
+    os.makedirs(output_dir, exist_ok=True)
+
+    results, metadata_rows, count_tables = [], [], []
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        futures = {
+            executor.submit(analyze_ifc_file, file_path, output_dir, table_format, class_types): file_path
+            for file_path in ifc_files
+        }
+        for done, future in enumerate(as_completed(futures), start=1):
+            file_path = futures[future]
+            try:
+                result = future.result()
+            except Exception as e:
+                logging.error(f"[{done}/{len(ifc_files)}] Failed to analyze {file_path}: {e}")
+                results.append({"File": file_path, "Status": "failed", "Error": str(e)})
+                continue
+            logging.info(f"[{done}/{len(ifc_files)}] {file_path}: {result['elements']} objects in {result['seconds']}s")
+            metadata_rows.append(result["metadata"])
+            count_tables.append(result["counts"])
+            results.append({"File": file_path, "Status": "ok", "Objects": result["elements"], "Seconds": result["seconds"]})
+
+    if metadata_rows:
+        metadata = pd.DataFrame(metadata_rows)
+        if "CreationDate" in metadata.columns:
+            metadata["CreationDate"] = metadata["CreationDate"].astype(str)
+        write_table(metadata, os.path.join(output_dir, f'metadata.{table_format}'), table_format)
+        write_table(pd.concat(count_tables, ignore_index=True), os.path.join(output_dir, f'component_counts.{table_format}'), table_format)
+    with open(os.path.join(output_dir, 'batch_summary.json'), 'w') as f:
+        json.dump(results, f, indent=2)
+    return results
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Analyze a directory of IFC files in parallel.")
+    parser.add_argument("input_dir", help="Directory containing .ifc files")
+    parser.add_argument("--output", "-o", default="analysis_output", help="Directory for the result tables")
+    parser.add_argument("--format", "-f", choices=TABLE_FORMATS, default="csv", help="Table format for the results")
+    parser.add_argument("--workers", "-w", type=int, default=None, help="Worker processes (defaults to the CPU count)")
+    parser.add_argument("--class", dest="class_types", action="append", help="IFC class to export objects for (repeatable, default IfcProduct)")
+    parser.add_argument("--recursive", "-r", action="store_true", help="Also search subdirectories")
+    args = parser.parse_args(argv)
+
+    results = run_batch(args.input_dir, args.output, args.format, args.workers, args.class_types, args.recursive)
+    failed = [result for result in results if result["Status"] != "ok"]
+    return 1 if failed or not results else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
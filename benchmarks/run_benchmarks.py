@@ -0,0 +1,163 @@
+"""Time and memory-profile the analysis functions on synthetic models of growing size.
+
+Run from the repository root:
+    python -m benchmarks.run_benchmarks --sizes 1000 10000 100000 --output bench_results.json
+
+Generated models are kept in --model-dir and reused on later runs, so only the
+first run pays for generating large models.
+"""
+import argparse
+import gc
+import json
+import logging
+import os
+import platform
+import sys
+import time
+import tracemalloc
+from datetime import datetime, timezone
+
+import psutil
+
+from benchmarks.synthetic_model import write_model
+
+DEFAULT_SIZES = [1000, 10000, 100000]
+
+
+def measure(stage, size, func, trace_python_allocations=False):
+    gc.collect()
+    process = psutil.Process()
+    rss_before = process.memory_info().rss
+    if trace_python_allocations:
+        tracemalloc.start()
+    wall_started, cpu_started = time.perf_counter(), time.process_time()
+    result, error = None, None
+    try:
+        result = func()
+    except Exception as e:
+        error = f"{type(e).__name__}: {e}"
+        logging.error(f"{stage} failed for {size} elements: {error}")
+    record = {
+        "stage": stage,
+        "elements": size,
+        "wall_seconds": round(time.perf_counter() - wall_started, 4),
+        "cpu_seconds": round(time.process_time() - cpu_started, 4),
+        "rss_delta_mb": round((process.memory_info().rss - rss_before) / (1024 * 1024), 2),
+        "error": error,
+    }
+    if trace_python_allocations:
+        record["python_peak_mb"] = round(tracemalloc.get_traced_memory()[1] / (1024 * 1024), 2)
+        tracemalloc.stop()
+    logging.info(f"{size:>9} {stage:<28} {record['wall_seconds']:>9.3f}s wall {record['rss_delta_mb']:>9.1f} MB RSS")
+    return result, record
+
+
+def model_path(model_dir, size, options):
+    option_key = '-'.join(f'{key}{value}' for key, value in sorted(options.items()))
+    return os.path.join(model_dir, f'synthetic_{size}_{option_key}.ifc')
+
+
+def benchmark_size(size, model_dir, options, stages, trace_python_allocations=False):
+    # Imported here so that --help works without the app dependencies.
+    import ifcopenshell
+    import analysis
+    import analysis_core
+    from model_index import ModelIndex, get_model_index
+    from extraction import extract_objects_dataframe
+    from model_diff import diff_fingerprints, fingerprint_model
+
+    records = []
+
+    def run(stage, func):
+        result, record = measure(stage, size, func, trace_python_allocations)
+        records.append(record)
+        return result
+
+    path = model_path(model_dir, size, options)
+    if not os.path.exists(path):
+        run("generate_model", lambda: write_model(path, size, **options))
+    records.append({"stage": "file_size", "elements": size, "megabytes": round(os.path.getsize(path) / (1024 * 1024), 2)})
+
+    ifc_file = run("ifcopenshell.open", lambda: ifcopenshell.open(path))
+    if ifc_file is None:
+        return records
+    if "index" in stages:
+        run("count_building_components", lambda: ModelIndex(ifc_file).component_count)
+    # Later stages share one index, as they do in the app.
+    get_model_index(ifc_file)
+    if "objects" in stages:
+        run("get_objects_data_by_class", lambda: analysis_core.get_objects_data_by_class(ifc_file, 'IfcProduct'))
+        dataframe = run("objects_dataframe", lambda: extract_objects_dataframe(ifc_file, ifc_file.by_type('IfcProduct')))
+        if dataframe is not None:
+            run("level_type_summary", lambda: analysis_core.summarize_by_level_and_type(dataframe))
+    if "compare" in stages:
+        run("compare_ifc_files", lambda: analysis_core.compare_ifc_files(ifc_file, ifc_file))
+        fingerprints = run("fingerprint_model", lambda: fingerprint_model(ifc_file))
+        if fingerprints is not None:
+            run("diff_fingerprints", lambda: diff_fingerprints(fingerprints, fingerprints))
+    if "pdf" in stages:
+        component_count = analysis_core.count_building_components(ifc_file)
+        figs = [analysis.visualize_component_count(component_count, chart_type) for chart_type in ('Bar Chart', 'Pie Chart')]
+        run("export_analysis_to_pdf", lambda: analysis.export_analysis_to_pdf(
+            analysis_core.get_ifc_metadata(ifc_file), component_count, figs, "Benchmark", "Benchmark Report", "Synthetic model benchmark."))
+    return records
+
+
+def environment():
+    info = {
+        "timestamp": datetime.now(timezone.utc).isoformat(),
+        "python": sys.version.split()[0],
+        "platform": platform.platform(),
+        "cpu_count": os.cpu_count(),
+        "memory_gb": round(psutil.virtual_memory().total / 1024 ** 3, 1),
+    }
+    try:
+        import ifcopenshell
+        from version import __version__
+        info["ifcopenshell"] = ifcopenshell.version
+        info["tool_version"] = __version__
+    except ImportError:
+        pass
+    return info
+
+
+def main(argv=None):
+    logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+    parser = argparse.ArgumentParser(description="Benchmark the IFC analysis functions on synthetic models.")
+    parser.add_argument("--sizes", type=int, nargs="+", default=DEFAULT_SIZES, help="Element counts to benchmark (e.g. 1000 10000 100000 1000000)")
+    parser.add_argument("--storeys", type=int, default=10)
+    parser.add_argument("--types-per-class", type=int, default=20)
+    parser.add_argument("--pset-density", type=float, default=1.0, help="Fraction of elements with occurrence property sets")
+    parser.add_argument("--psets-per-element", type=int, default=2)
+    parser.add_argument("--properties-per-set", type=int, default=8)
+    parser.add_argument("--qto-density", type=float, default=0.5, help="Fraction of elements with base quantities")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--stages", nargs="+", choices=["index", "objects", "compare", "pdf"], default=["index", "objects", "compare", "pdf"])
+    parser.add_argument("--model-dir", default=os.path.join("benchmarks", "models"))
+    parser.add_argument("--output", default="bench_results.json")
+    parser.add_argument("--trace-python-allocations", action="store_true", help="Also record peak Python heap with tracemalloc (slow)")
+    args = parser.parse_args(argv)
+
+    options = {
+        "storeys": args.storeys,
+        "types_per_class": args.types_per_class,
+        "pset_density": args.pset_density,
+        "psets_per_element": args.psets_per_element,
+        "properties_per_set": args.properties_per_set,
+        "qto_density": args.qto_density,
+        "seed": args.seed,
+    }
+    os.makedirs(args.model_dir, exist_ok=True)
+    results = {"environment": environment(), "options": options, "records": []}
+    for size in args.sizes:
+        results["records"].extend(benchmark_size(size, args.model_dir, options, set(args.stages), args.trace_python_allocations))
+
+    with open(args.output, 'w') as f:
+        json.dump(results, f, indent=2)
+    logging.info(f"Wrote {len(results['records'])} measurements to {args.output}")
+    failed = [record for record in results["records"] if record.get("error")]
+    return 1 if failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
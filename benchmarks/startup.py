@@ -0,0 +1,50 @@
+"""Check the cold-start import cost of the app against a budget.
+
+Imports app.py in a fresh interpreter and reports how long it took and which heavy
+dependencies it pulled in beyond what Streamlit itself loads. Exits non-zero if the
+budget is exceeded or a heavy module is imported eagerly.
+
+    python -m benchmarks.startup --budget 1.5
+"""
+import argparse
+import json
+import subprocess
+import sys
+
+HEAVY_MODULES = ["ifcopenshell", "pandas", "numpy", "plotly", "reportlab", "openpyxl", "pyarrow", "kaleido"]
+
+PROBE = """
+import json, sys, time
+started = time.perf_counter()
+import {module}
+elapsed = time.perf_counter() - started
+print(json.dumps({{"seconds": elapsed, "modules": sorted(sys.modules)}}))
+"""
+
+
+def probe(module):
+    output = subprocess.run([sys.executable, "-c", PROBE.format(module=module)], capture_output=True, text=True, check=True).stdout
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Measure the cold-start import time of the app.")
+    parser.add_argument("--budget", type=float, default=1.5, help="Allowed seconds for importing app.py on top of Streamlit")
+    args = parser.parse_args(argv)
+
+    baseline = probe("streamlit")
+    app = probe("app")
+    baseline_roots = {name.split('.')[0] for name in baseline["modules"]}
+    app_roots = {name.split('.')[0] for name in app["modules"]}
+    eager = sorted(module for module in HEAVY_MODULES if module in app_roots and module not in baseline_roots)
+    overhead = app["seconds"] - baseline["seconds"]
+
+    print(f"import streamlit: {baseline['seconds']:.3f}s")
+    print(f"import app:       {app['seconds']:.3f}s (app overhead {overhead:.3f}s, budget {args.budget:.3f}s)")
+    if eager:
+        print(f"Heavy modules imported at startup: {', '.join(eager)}")
+    return 1 if eager or overhead > args.budget else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,114 @@
+"""Synthetic IFC models of a given size for benchmarking.
+
+The project, site, building and storeys are authored through ifcopenshell.api.
+The bulk elements are created with create_entity directly, which is orders of
+magnitude faster and makes 1M-element models practical.
+"""
+import random
+
+import ifcopenshell
+import ifcopenshell.api
+import ifcopenshell.guid
+
+ELEMENT_CLASSES = [
+    ('IfcWall', 'IfcWallType'),
+    ('IfcSlab', 'IfcSlabType'),
+    ('IfcBeam', 'IfcBeamType'),
+    ('IfcColumn', 'IfcColumnType'),
+    ('IfcDoor', 'IfcDoorType'),
+    ('IfcWindow', 'IfcWindowType'),
+]
+
+
+def _placement(model, relative_to, x=0.0, y=0.0, z=0.0):
+    point = model.createIfcCartesianPoint((float(x), float(y), float(z)))
+    return model.createIfcLocalPlacement(relative_to, model.createIfcAxis2Placement3D(point, None, None))
+
+
+def _property_set(model, name, properties_per_set, rng):
+    properties = [
+        model.createIfcPropertySingleValue(f'Property{index}', None, model.create_entity('IfcLabel', f'Value{rng.randrange(50)}'), None)
+        if index % 2 else
+        model.createIfcPropertySingleValue(f'Property{index}', None, model.create_entity('IfcReal', rng.random() * 100), None)
+        for index in range(properties_per_set)
+    ]
+    return model.createIfcPropertySet(ifcopenshell.guid.new(), None, name, None, properties)
+
+
+def _quantity_set(model, rng):
+    quantities = [
+        model.create_entity('IfcQuantityLength', Name='Length', LengthValue=rng.uniform(0.5, 12.0)),
+        model.create_entity('IfcQuantityArea', Name='NetSideArea', AreaValue=rng.uniform(1.0, 40.0)),
+        model.create_entity('IfcQuantityVolume', Name='NetVolume', VolumeValue=rng.uniform(0.1, 20.0)),
+    ]
+    return model.createIfcElementQuantity(ifcopenshell.guid.new(), None, 'Qto_BaseQuantities', None, None, quantities)
+
+
+def generate_model(element_count, storeys=10, types_per_class=20, pset_density=1.0, psets_per_element=2,
+                   properties_per_set=8, qto_density=0.5, schema='IFC4', seed=0):
+    """Build an in-memory model with ``element_count`` building elements.
+
+    pset_density and qto_density are the fractions of elements that carry their
+    own occurrence property sets and base quantities. Every type also carries
+    one shared property set.
+    """
+    rng = random.Random(seed)
+    model = ifcopenshell.file(schema=schema)
+    project = ifcopenshell.api.run('root.create_entity', model, ifc_class='IfcProject', name='Synthetic Benchmark Project')
+    ifcopenshell.api.run('unit.assign_unit', model)
+
+    site_placement = _placement(model, None)
+    building_placement = _placement(model, site_placement)
+    site = model.create_entity('IfcSite', GlobalId=ifcopenshell.guid.new(), Name='Site', ObjectPlacement=site_placement)
+    building = model.create_entity('IfcBuilding', GlobalId=ifcopenshell.guid.new(), Name='Building', ObjectPlacement=building_placement)
+    model.createIfcRelAggregates(ifcopenshell.guid.new(), None, None, None, project, [site])
+    model.createIfcRelAggregates(ifcopenshell.guid.new(), None, None, None, site, [building])
+
+    storey_entities = []
+    for level in range(storeys):
+        storey_entities.append(model.create_entity(
+            'IfcBuildingStorey', GlobalId=ifcopenshell.guid.new(), Name=f'Level {level}',
+            ObjectPlacement=_placement(model, building_placement, z=level * 3.5), Elevation=level * 3.5,
+        ))
+    model.createIfcRelAggregates(ifcopenshell.guid.new(), None, None, None, building, storey_entities)
+
+    element_types = []
+    for element_class, type_class in ELEMENT_CLASSES:
+        for index in range(types_per_class):
+            type_name = f'{element_class[3:]}Type{index}'
+            shared_pset = _property_set(model, f'Pset_{type_name}Common', properties_per_set, rng)
+            element_types.append((element_class, model.create_entity(
+                type_class, GlobalId=ifcopenshell.guid.new(), Name=type_name, HasPropertySets=[shared_pset],
+            )))
+
+    contained = [[] for _ in storey_entities]
+    typed = {}
+    for index in range(element_count):
+        element_class, element_type = element_types[index % len(element_types)]
+        storey_index = index % storeys
+        element = model.create_entity(
+            element_class, GlobalId=ifcopenshell.guid.new(), Name=f'{element_type.Name}:{index}',
+            ObjectPlacement=_placement(model, storey_entities[storey_index].ObjectPlacement, x=index % 1000, y=index // 1000),
+        )
+        contained[storey_index].append(element)
+        typed.setdefault(element_type.id(), (element_type, []))[1].append(element)
+
+        if rng.random() < pset_density:
+            for pset_index in range(psets_per_element):
+                pset = _property_set(model, f'Pset_Synthetic{pset_index}', properties_per_set, rng)
+                model.createIfcRelDefinesByProperties(ifcopenshell.guid.new(), None, None, None, [element], pset)
+        if rng.random() < qto_density:
+            model.createIfcRelDefinesByProperties(ifcopenshell.guid.new(), None, None, None, [element], _quantity_set(model, rng))
+
+    for storey, elements in zip(storey_entities, contained):
+        if elements:
+            model.createIfcRelContainedInSpatialStructure(ifcopenshell.guid.new(), None, None, None, elements, storey)
+    for element_type, elements in typed.values():
+        model.createIfcRelDefinesByType(ifcopenshell.guid.new(), None, None, None, elements, element_type)
+    return model
+
+
+def write_model(file_path, element_count, **options):
+    model = generate_model(element_count, **options)
+    model.write(file_path)
+    return file_path
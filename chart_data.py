@@ -0,0 +1,56 @@
+# Server-side reductions so chart payloads stay bounded whatever the row count.
+import numpy as np
+import pandas as pd
+
+MAX_HISTOGRAM_BINS = 50
+TOP_N_CATEGORIES = 30
+MAX_SERIES_POINTS = 2000
+OTHER_LABEL = "Other"
+
+
+def histogram(values, max_bins=MAX_HISTOGRAM_BINS):
+    values = pd.to_numeric(pd.Series(values), errors='coerce').astype(float).to_numpy()
+    values = values[np.isfinite(values)]
+    if values.size == 0:
+        return np.array([]), np.array([])
+    edges = np.histogram_bin_edges(values, bins='auto')
+    if len(edges) - 1 > max_bins:
+        edges = np.histogram_bin_edges(values, bins=max_bins)
+    counts, edges = np.histogram(values, bins=edges)
+    return counts, edges
+
+
+def top_n_counts(values, top_n=TOP_N_CATEGORIES, other_label=OTHER_LABEL):
+    counts = pd.Series(values).value_counts()
+    if len(counts) <= top_n:
+        return counts
+    top = counts.iloc[:top_n]
+    top.index = top.index.astype(str)
+    return pd.concat([top, pd.Series({other_label: counts.iloc[top_n:].sum()})])
+
+
+def lttb_downsample(x, y, threshold=MAX_SERIES_POINTS):
+    """Largest-Triangle-Three-Buckets: keeps the points that preserve the visual shape of a series."""
+    x = np.asarray(x, dtype=float)
+    y = np.asarray(y, dtype=float)
+    finite = np.isfinite(x) & np.isfinite(y)
+    x, y = x[finite], y[finite]
+    length = len(x)
+    if threshold < 3 or length <= threshold:
+        return x, y
+
+    # First and last points are always kept; the rest is split into threshold - 2 buckets.
+    edges = np.linspace(1, length - 1, threshold - 1).astype(int)
+    selected = np.empty(threshold, dtype=int)
+    selected[0] = 0
+    anchor = 0
+    for bucket in range(threshold - 2):
+        start, end = edges[bucket], edges[bucket + 1]
+        next_end = edges[bucket + 2] if bucket + 2 < len(edges) else length
+        average_x = x[end:next_end].mean()
+        average_y = y[end:next_end].mean()
+        areas = np.abs((x[anchor] - average_x) * (y[start:end] - y[anchor]) - (x[anchor] - x[start:end]) * (average_y - y[anchor]))
+        anchor = start + int(areas.argmax())
+        selected[bucket + 1] = anchor
+    selected[-1] = length - 1
+    return x[selected], y[selected]
@@ -0,0 +1,109 @@
+import hashlib
+import multiprocessing
+import os
+import threading
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+
+import plotly.io as pio
+
+from tracing import trace_stage
+
+RENDER_CACHE_SIZE = int(os.environ.get('IFC_TOOL_RENDER_CACHE_SIZE', 64))
+MAX_RENDER_WORKERS = int(os.environ.get('IFC_TOOL_RENDER_WORKERS', min(4, os.cpu_count() or 1)))
+REPORT_LAYOUT = dict(paper_bgcolor='white', plot_bgcolor='white', font_color='black')
+
+_render_cache = OrderedDict()
+_render_cache_lock = threading.Lock()
+_render_pool = None
+_render_pool_lock = threading.Lock()
+
+
+def figure_key(fig_json):
+    return hashlib.sha256(fig_json.encode('utf-8')).hexdigest()
+
+
+def render_png(fig_json):
+    # Process pool entry point; each worker drives its own kaleido instance.
+    return pio.from_json(fig_json).to_image(format='png')
+
+
+def _cached_png(key):
+    with _render_cache_lock:
+        png = _render_cache.get(key)
+        if png is not None:
+            _render_cache.move_to_end(key)
+        return png
+
+
+def _cache_png(key, png):
+    with _render_cache_lock:
+        _render_cache[key] = png
+        while len(_render_cache) > RENDER_CACHE_SIZE:
+            _render_cache.popitem(last=False)
+
+
+def _render_executor(max_workers):
+    # One pool per server process, started on first export so its kaleido workers are reused.
+    # Workers are spawned: forking a process that runs Streamlit's threads can deadlock the child.
+    global _render_pool
+    with _render_pool_lock:
+        if _render_pool is None:
+            _render_pool = ProcessPoolExecutor(max_workers=max_workers, mp_context=multiprocessing.get_context('spawn'))
+        return _render_pool
+
+
+def _discard_executor(executor):
+    global _render_pool
+    with _render_pool_lock:
+        if _render_pool is executor:
+            _render_pool = None
+    executor.shutdown(wait=False, cancel_futures=True)
+
+
+def _render_missing(missing, max_workers):
+    rendered = {}
+    if len(missing) == 1 or max_workers <= 1:
+        for key, fig_json in missing.items():
+            try:
+                rendered[key] = render_png(fig_json)
+            except Exception as e:
+                rendered[key] = e
+    elif missing:
+        executor = _render_executor(max_workers)
+        futures = {key: executor.submit(render_png, fig_json) for key, fig_json in missing.items()}
+        for key, future in futures.items():
+            try:
+                rendered[key] = future.result()
+            except BrokenProcessPool as e:
+                # A crashed worker breaks the whole pool; the next export starts a new one.
+                _discard_executor(executor)
+                rendered[key] = e
+            except Exception as e:
+                rendered[key] = e
+    return rendered
+
+
+def render_figures(figs, max_workers=MAX_RENDER_WORKERS):
+    """Render figures to PNG bytes, in order. A failed render is returned as its exception."""
+    fig_jsons = []
+    for fig in figs:
+        fig.update_layout(**REPORT_LAYOUT)
+        fig_jsons.append(fig.to_json())
+    keys = [figure_key(fig_json) for fig_json in fig_jsons]
+    results = [_cached_png(key) for key in keys]
+
+    # Identical figures are rendered once.
+    missing = OrderedDict()
+    for position, (key, png) in enumerate(zip(keys, results)):
+        if png is None:
+            missing.setdefault(key, fig_jsons[position])
+
+    with trace_stage("render_charts", charts=len(figs), rendered=len(missing)):
+        rendered = _render_missing(missing, max_workers)
+
+    for key, png in rendered.items():
+        if not isinstance(png, Exception):
+            _cache_png(key, png)
+    return [png if png is not None else rendered[key] for key, png in zip(keys, results)]
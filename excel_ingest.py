@@ -0,0 +1,127 @@
+import hashlib
+import json
+import logging
+import os
+import tempfile
+
+import pandas as pd
+from openpyxl import load_workbook
+
+from table_io import make_parquet_safe, write_table
+
+EXCEL_CACHE_DIR = os.environ.get('IFC_TOOL_EXCEL_CACHE_DIR', os.path.join(tempfile.gettempdir(), 'ifc_analysis_tool_cache', 'excel'))
+EXCEL_CACHE_MAX_MB = int(os.environ.get('IFC_TOOL_EXCEL_CACHE_MAX_MB', 2048))
+PROGRESS_EVERY_ROWS = 10000
+LAYOUT_CACHE_SIZE = 32
+# Part of the cache key; raise it when the cached content changes, e.g. the column naming.
+EXCEL_CACHE_FORMAT = 2
+
+_layouts = {}
+
+
+def _open_workbook(file_path):
+    # Read-only mode streams rows from the XML instead of building every cell object up front.
+    return load_workbook(file_path, read_only=True, data_only=True)
+
+
+def _column_names(header):
+    # Same naming as pandas.read_excel (PythonParser._infer_columns): blank headers become
+    # "Unnamed: i", repeats get ".1", ".2", ... skipping names that occur anywhere in the
+    # header, and named columns are numbered before unnamed ones.
+    names = [f"Unnamed: {position}" if value is None or value == "" else str(value) for position, value in enumerate(header)]
+    unnamed = [position for position, value in enumerate(header) if value is None or value == ""]
+    order = [position for position in range(len(names)) if position not in set(unnamed)] + unnamed
+    counts = {}
+    for position in order:
+        name = original = names[position]
+        count = counts.get(name, 0)
+        while count > 0:
+            counts[original] = count + 1
+            name = f"{original}.{count}"
+            count = count + 1 if name in names else counts.get(name, 0)
+        names[position] = name
+        counts[name] = count + 1
+    return names
+
+
+def read_layout(file_path, file_hash=None):
+    """Sheet names and their header rows, read without loading any data rows."""
+    if file_hash and file_hash in _layouts:
+        return _layouts[file_hash]
+    workbook = _open_workbook(file_path)
+    try:
+        layout = {}
+        for worksheet in workbook.worksheets:
+            header = next(worksheet.iter_rows(max_row=1, values_only=True), ())
+            layout[worksheet.title] = _column_names(header)
+    finally:
+        workbook.close()
+    if file_hash:
+        _layouts[file_hash] = layout
+        while len(_layouts) > LAYOUT_CACHE_SIZE:
+            _layouts.pop(next(iter(_layouts)))
+    return layout
+
+
+def stream_sheet(file_path, sheet_name, columns=None, progress=None):
+    workbook = _open_workbook(file_path)
+    try:
+        worksheet = workbook[sheet_name]
+        total_rows = worksheet.max_row - 1 if worksheet.max_row else None
+        rows = worksheet.iter_rows(values_only=True)
+        names = _column_names(next(rows, ()))
+        columns = list(columns) if columns else names
+        positions = [names.index(column) for column in columns]
+        data = [[] for _ in positions]
+
+        row_count = 0
+        for row_count, row in enumerate(rows, start=1):
+            width = len(row)
+            for values, position in zip(data, positions):
+                values.append(row[position] if position < width else None)
+            if progress and row_count % PROGRESS_EVERY_ROWS == 0:
+                progress(row_count, total_rows)
+        if progress:
+            progress(row_count, row_count)
+    finally:
+        workbook.close()
+    return pd.DataFrame(dict(zip(columns, data)), columns=columns).infer_objects()
+
+
+def _cache_path(file_hash, sheet_name, columns):
+    key = json.dumps([EXCEL_CACHE_FORMAT, file_hash, sheet_name, list(columns) if columns else None])
+    return os.path.join(EXCEL_CACHE_DIR, hashlib.sha256(key.encode('utf-8')).hexdigest() + '.parquet')
+
+
+def _trim_cache(max_mb=EXCEL_CACHE_MAX_MB):
+    entries = sorted((entry.stat().st_mtime, entry.stat().st_size, entry.path) for entry in os.scandir(EXCEL_CACHE_DIR) if entry.is_file())
+    total = sum(size for _, size, _ in entries)
+    for _, size, path in entries:
+        if total <= max_mb * 1024 * 1024:
+            break
+        os.remove(path)
+        total -= size
+
+
+def load_sheet(file_path, file_hash, sheet_name, columns=None, progress=None):
+    """Load the selected columns of a sheet, parsing the workbook only on the first request.
+
+    Parsed sheets are kept as Parquet keyed by upload hash, sheet and columns, and
+    memory-mapped on later reruns.
+    """
+    cache_path = _cache_path(file_hash, sheet_name, columns)
+    if os.path.exists(cache_path):
+        os.utime(cache_path)
+        return pd.read_parquet(cache_path, memory_map=True)
+
+    # Same column types as a cache hit would give.
+    dataframe = make_parquet_safe(stream_sheet(file_path, sheet_name, columns, progress))
+    try:
+        os.makedirs(EXCEL_CACHE_DIR, exist_ok=True)
+        tmp_path = cache_path + '.tmp'
+        write_table(dataframe, tmp_path, 'parquet')
+        os.replace(tmp_path, cache_path)
+        _trim_cache()
+    except Exception as e:
+        logging.warning(f"Could not cache parsed sheet {sheet_name}: {e}")
+    return dataframe
@@ -0,0 +1,263 @@
+from collections import Counter, defaultdict
+
+import numpy as np
+import pandas as pd
+import ifcopenshell.util.element as Element
+from model_index import get_model_index
+from tracing import trace_stage
+
+BASE_COLUMNS = ["ExpressId", "GlobalId", "Class", "PredefinedType", "Name", "Level", "Type"]
+CATEGORICAL_COLUMNS = {"Class", "PredefinedType", "Level", "Type"}
+NUMERIC_INFERRED_TYPES = {"integer", "floating", "mixed-integer-float", "decimal"}
+PROGRESS_EVERY_ELEMENTS = 1000
+# Property columns filled for less than this fraction of rows are held as sparse arrays.
+SPARSE_MAX_DENSITY = 0.5
+EXPORT_CHUNK_ROWS = 50000
+
+
+def get_predefined_type(element, element_type):
+    # Same rules as ifcopenshell.util.element.get_predefined_type, with the type already resolved.
+    if element_type is not None:
+        predefined_type = getattr(element_type, 'PredefinedType', None)
+        if predefined_type == 'USERDEFINED' or not predefined_type:
+            predefined_type = getattr(element_type, 'ElementType', None)
+        if predefined_type and predefined_type != 'NOTDEFINED':
+            return predefined_type
+    predefined_type = getattr(element, 'PredefinedType', None)
+    if predefined_type == 'USERDEFINED' or not predefined_type:
+        predefined_type = getattr(element, 'ObjectType', None)
+    return predefined_type
+
+
+def _iter_definitions(definition):
+    # IFC4 allows a relationship to point at a set of property set definitions.
+    if isinstance(definition, tuple):
+        yield from definition
+    elif definition is not None:
+        yield definition
+
+
+class PropertyResolver:
+    """Resolves property sets and quantity sets for many elements at once.
+
+    Each IfcRelDefinesByProperties is visited once and each property definition
+    is read once, however many elements share it.
+    """
+
+    def __init__(self, ifc_file, elements):
+        self.index = get_model_index(ifc_file)
+        self._definitions = defaultdict(list)
+        self._resolved = {}
+        self._use_counts = Counter()
+
+        element_ids = {element.id() for element in elements}
+        for rel in ifc_file.by_type('IfcRelDefinesByProperties'):
+            definitions = None
+            for related_object in rel.RelatedObjects or ():
+                if related_object.id() in element_ids:
+                    if definitions is None:
+                        definitions = list(_iter_definitions(rel.RelatingPropertyDefinition))
+                    self._definitions[related_object.id()].extend(definitions)
+                    self._use_counts.update(definition.id() for definition in definitions)
+
+    def get_type(self, element):
+        if element.is_a('IfcTypeObject'):
+            return element
+        return self.index.get_type(element)
+
+    def _resolve(self, definition, shared=True):
+        properties = self._resolved.get(definition.id())
+        if properties is None:
+            properties = Element.get_property_definition(definition)
+            # Definitions used by one element only are not kept, so memory stays bounded when streaming.
+            if shared:
+                self._resolved[definition.id()] = properties
+        return properties
+
+    def _collect(self, element, element_type, definition_class):
+        # Type properties first, then occurrence properties override them, like Element.get_psets.
+        psets = {}
+        if element_type is not None:
+            for definition in getattr(element_type, 'HasPropertySets', None) or ():
+                if definition.is_a(definition_class):
+                    psets[definition.Name] = self._resolve(definition)
+        if element_type is not element:
+            for definition in self._definitions.get(element.id(), ()):
+                if definition.is_a(definition_class):
+                    properties = self._resolve(definition, self._use_counts[definition.id()] > 1)
+                    if definition.Name in psets:
+                        psets[definition.Name] = {**psets[definition.Name], **properties}
+                    else:
+                        psets[definition.Name] = properties
+        return psets
+
+    def get_psets(self, element, element_type):
+        return self._collect(element, element_type, 'IfcPropertySet')
+
+    def get_qtos(self, element, element_type):
+        return self._collect(element, element_type, 'IfcElementQuantity')
+
+
+def iter_object_records(ifc_file, elements, progress=None):
+    # progress(done, total) is called every PROGRESS_EVERY_ELEMENTS elements and may raise to stop the extraction.
+    elements = list(elements)
+    resolver = PropertyResolver(ifc_file, elements)
+    for done, obj in enumerate(elements):
+        if progress and done % PROGRESS_EVERY_ELEMENTS == 0:
+            progress(done, len(elements))
+        element_type = resolver.get_type(obj)
+        container = resolver.index.get_container(obj)
+        record = {
+            "ExpressId": obj.id(),
+            "GlobalId": getattr(obj, 'GlobalId', None),
+            "Class": obj.is_a(),
+            "PredefinedType": get_predefined_type(obj, element_type),
+            "Name": getattr(obj, 'Name', None),
+            "Level": container.Name if container else "",
+            "Type": element_type.Name if element_type else "",
+        }
+        yield record, resolver.get_psets(obj, element_type), resolver.get_qtos(obj, element_type)
+    if progress:
+        progress(len(elements), len(elements))
+
+
+def extract_objects(ifc_file, elements):
+    pset_attributes = set()
+    objects_data = []
+    for record, psets, qtos in iter_object_records(ifc_file, elements):
+        for sets in (psets, qtos):
+            for pset_name, pset_data in sets.items():
+                pset_attributes.update(f'{pset_name}.{property_name}' for property_name in pset_data)
+        record["QuantitySets"] = qtos
+        record["PropertySets"] = psets
+        objects_data.append(record)
+    return objects_data, list(pset_attributes)
+
+
+def _pset_column(rows, values, length, numeric):
+    column = pd.Series(values, index=rows, dtype=object).reindex(range(length))
+    if numeric or pd.api.types.infer_dtype(column, skipna=True) in NUMERIC_INFERRED_TYPES:
+        try:
+            return pd.to_numeric(column)
+        except (TypeError, ValueError):
+            pass
+    return column
+
+
+class _ColumnBuilder:
+    # Collects records column by column; for pset columns only rows that carry the property are stored.
+
+    def __init__(self):
+        self.base_columns = {column: [] for column in BASE_COLUMNS}
+        # attribute -> (row positions, values)
+        self.pset_columns = {}
+        self.quantity_attributes = set()
+        self.length = 0
+
+    def add(self, record, psets, qtos):
+        row = self.length
+        self.length += 1
+        for column in BASE_COLUMNS:
+            self.base_columns[column].append(record[column])
+        for sets, is_quantity in ((psets, False), (qtos, True)):
+            for pset_name, pset_data in sets.items():
+                # Property sets shadow quantity sets of the same name.
+                if is_quantity and pset_name in psets:
+                    continue
+                for property_name, value in pset_data.items():
+                    attribute = f'{pset_name}.{property_name}'
+                    rows, values = self.pset_columns.setdefault(attribute, ([], []))
+                    rows.append(row)
+                    values.append(value)
+                    if is_quantity and property_name != 'id':
+                        self.quantity_attributes.add(attribute)
+
+    def build(self):
+        columns = {}
+        for column, values in self.base_columns.items():
+            columns[column] = pd.Categorical(values) if column in CATEGORICAL_COLUMNS else pd.Series(values)
+        for attribute in sorted(self.pset_columns):
+            rows, values = self.pset_columns.pop(attribute)
+            columns[attribute] = _pset_column(rows, values, self.length, attribute in self.quantity_attributes)
+        return pd.DataFrame(columns)
+
+
+def extract_objects_dataframe(ifc_file, elements, progress=None):
+    builder = _ColumnBuilder()
+    with trace_stage("extract_objects") as span:
+        for record, psets, qtos in iter_object_records(ifc_file, elements, progress):
+            builder.add(record, psets, qtos)
+        span["elements"] = builder.length
+
+    with trace_stage("build_dataframe", rows=builder.length, columns=len(BASE_COLUMNS) + len(builder.pset_columns)):
+        return builder.build()
+
+
+def iter_object_frames(ifc_file, elements, chunk_size=EXPORT_CHUNK_ROWS, progress=None):
+    """Yield the object table in DataFrames of at most chunk_size rows.
+
+    Each chunk only has the pset columns used within it; table_io.write_table_stream
+    aligns them to one schema.
+    """
+    builder = _ColumnBuilder()
+    for record, psets, qtos in iter_object_records(ifc_file, elements, progress):
+        builder.add(record, psets, qtos)
+        if builder.length >= chunk_size:
+            yield builder.build()
+            builder = _ColumnBuilder()
+    if builder.length:
+        yield builder.build()
+
+
+def _to_sparse(series):
+    if pd.api.types.is_float_dtype(series.dtype):
+        return series.astype(pd.SparseDtype(series.dtype, np.nan))
+    values = series.astype(object)
+    return values.where(values.notna(), np.nan).astype(pd.SparseDtype(object, np.nan))
+
+
+def sparsify_pset_columns(dataframe, max_density=SPARSE_MAX_DENSITY):
+    # A table of all products has hundreds of pset columns, most of which apply to a few classes only.
+    if dataframe.empty:
+        return dataframe
+    sparse_columns = {}
+    for column in dataframe.columns:
+        if column in BASE_COLUMNS:
+            continue
+        series = dataframe[column]
+        if not isinstance(series.dtype, pd.SparseDtype) and series.notna().mean() < max_density:
+            sparse_columns[column] = _to_sparse(series)
+    return dataframe.assign(**sparse_columns) if sparse_columns else dataframe
+
+
+def drop_empty_pset_columns(dataframe):
+    empty = []
+    for column in dataframe.columns:
+        if column in BASE_COLUMNS:
+            continue
+        series = dataframe[column]
+        if series.sparse.npoints == 0 if isinstance(series.dtype, pd.SparseDtype) else series.isna().all():
+            empty.append(column)
+    return dataframe.drop(columns=empty) if empty else dataframe
+
+
+def densify_columns(dataframe, drop_empty=True):
+    """Dense copy of the table for display and export, without pset columns that are empty in it."""
+    columns = {}
+    for column in dataframe.columns:
+        series = dataframe[column]
+        if column not in BASE_COLUMNS:
+            if isinstance(series.dtype, pd.SparseDtype):
+                if drop_empty and series.sparse.npoints == 0:
+                    continue
+                series = series.sparse.to_dense()
+            elif drop_empty and series.isna().all():
+                continue
+        columns[column] = series
+    return pd.DataFrame(columns, index=dataframe.index)
+
+
+def iter_dataframe_chunks(dataframe, chunk_size=EXPORT_CHUNK_ROWS):
+    # Dense slices of a (possibly sparse) table, so exports never hold a dense copy of all of it.
+    for start in range(0, len(dataframe), chunk_size):
+        yield densify_columns(dataframe.iloc[start:start + chunk_size], drop_empty=False)
@@ -0,0 +1,96 @@
+import logging
+import os
+
+import numpy as np
+import pandas as pd
+
+from tracing import trace_stage
+
+GEOMETRY_THREADS = int(os.environ.get('IFC_TOOL_GEOMETRY_THREADS', os.cpu_count() or 1))
+GEOMETRY_BATCH_SIZE = 1000
+# Quantities that are summed in the Level/Type summary.
+GEOMETRY_SUM_COLUMNS = ["Geometry.Volume", "Geometry.SurfaceArea", "Geometry.FootprintArea"]
+GEOMETRY_COLUMNS = GEOMETRY_SUM_COLUMNS + ["Geometry.SizeX", "Geometry.SizeY", "Geometry.SizeZ"]
+
+
+def mesh_quantities(verts, faces):
+    """Volume, surface area, footprint area and bounding box size of a triangulated shape.
+
+    Volume is only reported for closed meshes, where every edge is shared by exactly two triangles.
+    """
+    vertices = np.asarray(verts, dtype=float).reshape(-1, 3)
+    triangles = np.asarray(faces, dtype=np.int64).reshape(-1, 3)
+    if not len(triangles):
+        return [np.nan] * len(GEOMETRY_COLUMNS)
+    a, b, c = vertices[triangles[:, 0]], vertices[triangles[:, 1]], vertices[triangles[:, 2]]
+    normals = np.cross(b - a, c - a)
+    surface_area = 0.5 * np.linalg.norm(normals, axis=1).sum()
+    # Downward-facing triangles projected onto the ground plane.
+    footprint_area = -0.5 * normals[:, 2][normals[:, 2] < 0].sum()
+
+    edges = np.sort(triangles[:, [0, 1, 1, 2, 2, 0]].reshape(-1, 2), axis=1)
+    _, edge_counts = np.unique(edges, axis=0, return_counts=True)
+    if (edge_counts == 2).all():
+        volume = abs(np.einsum('ij,ij->i', a, np.cross(b, c)).sum()) / 6
+    else:
+        volume = np.nan
+
+    size = vertices.max(axis=0) - vertices.min(axis=0)
+    return [volume, surface_area, footprint_area, *size]
+
+
+def _geometry_settings():
+    import ifcopenshell.geom
+    settings = ifcopenshell.geom.settings()
+    # The setting is a constant in ifcopenshell 0.7 and a string name from 0.8 on.
+    settings.set(getattr(settings, 'USE_WORLD_COORDS', 'use-world-coords'), True)
+    return settings
+
+
+def _batch_frame(ids, rows):
+    return pd.DataFrame(rows, columns=GEOMETRY_COLUMNS).assign(ExpressId=ids)[["ExpressId"] + GEOMETRY_COLUMNS]
+
+
+def iter_geometry_batches(ifc_file, threads=GEOMETRY_THREADS, batch_size=GEOMETRY_BATCH_SIZE, progress=None):
+    """Tessellate the model on ``threads`` threads and yield quantities in DataFrames of ``batch_size`` rows.
+
+    progress(done, total) is called once per batch and may raise to stop the iteration.
+    """
+    import ifcopenshell.geom
+    total = sum(1 for product in ifc_file.by_type('IfcProduct') if getattr(product, 'Representation', None))
+    iterator = ifcopenshell.geom.iterator(_geometry_settings(), ifc_file, max(threads, 1))
+    if not iterator.initialize():
+        return
+    ids, rows, done = [], [], 0
+    while True:
+        shape = iterator.get()
+        try:
+            rows.append(mesh_quantities(shape.geometry.verts, shape.geometry.faces))
+            ids.append(shape.id)
+        except Exception as e:
+            logging.warning(f"Skipping geometry of element #{shape.id}: {e}")
+        done += 1
+        if len(ids) >= batch_size:
+            yield _batch_frame(ids, rows)
+            ids, rows = [], []
+            if progress:
+                progress(done, max(total, done))
+        if not iterator.next():
+            break
+    if ids:
+        yield _batch_frame(ids, rows)
+    if progress:
+        progress(done, done)
+
+
+def compute_geometry_quantities(ifc_file, threads=GEOMETRY_THREADS, progress=None):
+    with trace_stage("geometry_quantities", threads=threads) as span:
+        batches = list(iter_geometry_batches(ifc_file, threads, progress=progress))
+        geometry = pd.concat(batches, ignore_index=True) if batches else _batch_frame([], [])
+        span["elements"] = len(geometry)
+    return geometry
+
+
+def add_geometry_quantities(objects, geometry):
+    quantities = geometry.set_index("ExpressId")
+    return objects.join(quantities, on="ExpressId")
@@ -0,0 +1,147 @@
+import contextvars
+import logging
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+# Threads rather than processes: jobs share the parsed models held in model_cache.
+JOB_WORKERS = int(os.environ.get('IFC_TOOL_JOB_WORKERS', 2))
+
+
+class JobCancelled(Exception):
+    pass
+
+
+class Job:
+    """One background computation, with progress reporting and cooperative cancellation.
+
+    The job function receives the Job and calls ``report`` as it goes; ``report``
+    raises JobCancelled once cancellation has been requested.
+    """
+
+    def __init__(self, key, description):
+        self.key = key
+        self.description = description
+        self.status = 'queued'
+        self.stage = description
+        self.done = 0
+        self.total = None
+        self.result = None
+        self.error = None
+        self.submitted_at = time.time()
+        self.started_at = None
+        self.finished_at = None
+        self.subscribers = 1
+        self._cancel_requested = threading.Event()
+        self._finished = threading.Event()
+
+    def report(self, done=None, total=None, stage=None):
+        if stage is not None:
+            self.stage = stage
+            self.done, self.total = 0, None
+        if done is not None:
+            self.done = done
+        if total is not None:
+            self.total = total
+        if self._cancel_requested.is_set():
+            raise JobCancelled(self.description)
+
+    def cancel(self):
+        self._cancel_requested.set()
+
+    def wait(self, timeout=None):
+        return self._finished.wait(timeout)
+
+    @property
+    def cancel_requested(self):
+        return self._cancel_requested.is_set()
+
+    @property
+    def finished(self):
+        return self._finished.is_set()
+
+    @property
+    def fraction(self):
+        if not self.total:
+            return None
+        return min(self.done / self.total, 1.0)
+
+    def progress_text(self):
+        elapsed = time.time() - (self.started_at or self.submitted_at)
+        if self.status == 'queued':
+            return f"{self.description}: waiting for a free worker ({elapsed:.0f}s)"
+        if self.total:
+            return f"{self.stage}: {self.done:,} of {self.total:,} elements ({elapsed:.0f}s)"
+        return f"{self.stage} ({elapsed:.0f}s)"
+
+
+class JobRunner:
+    """Runs jobs on a shared thread pool, one job per key.
+
+    Submitting a key that is already queued or running attaches to that job
+    instead of starting the work again. A job is only cancelled once every
+    session that submitted it has released it.
+    """
+
+    def __init__(self, max_workers=JOB_WORKERS):
+        self._executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix='ifc-job')
+        self._jobs = {}
+        self._lock = threading.Lock()
+
+    def attach(self, key):
+        # Returns the queued or running job for key, or None if the caller has to submit it.
+        with self._lock:
+            job = self._jobs.get(key)
+            if job is None or job.cancel_requested:
+                return None
+            job.subscribers += 1
+            return job
+
+    def submit(self, key, description, func, *args):
+        with self._lock:
+            job = self._jobs.get(key)
+            if job is not None and not job.cancel_requested:
+                job.subscribers += 1
+                return job
+            job = Job(key, description)
+            self._jobs[key] = job
+        # Copy the caller's context so spans recorded by the job land in the submitting session's trace.
+        context = contextvars.copy_context()
+        self._executor.submit(context.run, self._run, job, func, args)
+        return job
+
+    def _run(self, job, func, args):
+        job.status = 'running'
+        job.started_at = time.time()
+        try:
+            job.report()
+            job.result = func(job, *args)
+            job.status = 'done'
+        except JobCancelled:
+            job.status = 'cancelled'
+            logging.info(f"Cancelled job: {job.description}")
+        except Exception as e:
+            job.error = e
+            job.status = 'failed'
+            logging.error(f"Job failed: {job.description}: {e}")
+        finally:
+            job.finished_at = time.time()
+            with self._lock:
+                if self._jobs.get(job.key) is job:
+                    del self._jobs[job.key]
+            job._finished.set()
+
+    def release(self, job):
+        with self._lock:
+            job.subscribers -= 1
+            if job.subscribers <= 0 and not job.finished:
+                job.cancel()
+
+    def active_jobs(self):
+        with self._lock:
+            return list(self._jobs.values())
+
+
+# Module level so jobs outlive the script run that submitted them and are shared across sessions.
+job_runner = JobRunner()
@@ -0,0 +1,136 @@
+import gc
+import hashlib
+import logging
+import os
+import threading
+from collections import OrderedDict
+
+import psutil
+
+from tracing import trace_stage
+
+# Memory budget (in MB) for parsed IFC models held by this server process.
+DEFAULT_MAX_RSS_MB = int(os.environ.get('IFC_MODEL_CACHE_MAX_RSS_MB', 4096))
+HASH_CHUNK_SIZE = 8 * 1024 * 1024
+
+
+# Hashes computed while an upload was being copied, so the file is not read a second time.
+_known_hashes = {}
+_known_hashes_lock = threading.Lock()
+
+
+def _file_signature(file_path):
+    stat = os.stat(file_path)
+    return stat.st_size, stat.st_mtime_ns
+
+
+def remember_content_hash(file_path, file_hash):
+    with _known_hashes_lock:
+        _known_hashes[file_path] = (_file_signature(file_path), file_hash)
+
+
+def forget_content_hash(file_path):
+    with _known_hashes_lock:
+        _known_hashes.pop(file_path, None)
+
+
+def file_content_hash(file_path, chunk_size=HASH_CHUNK_SIZE):
+    with _known_hashes_lock:
+        known = _known_hashes.get(file_path)
+    if known is not None and known[0] == _file_signature(file_path):
+        return known[1]
+    digest = hashlib.sha256()
+    with trace_stage("hash_file", bytes=os.path.getsize(file_path)), open(file_path, 'rb') as f:
+        for chunk in iter(lambda: f.read(chunk_size), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+class ModelCache:
+    """Parsed IFC models keyed by upload content hash, shared by all sessions.
+
+    Each model is charged the RSS growth measured while it was parsed, and at
+    least its file size. Freed memory is often not returned to the OS, so the
+    process RSS cannot tell whether an eviction helped. Least recently used
+    models are evicted once the charged sizes add up to more than ``max_rss_mb``.
+    The most recently used model is always kept.
+    """
+
+    def __init__(self, max_rss_mb=DEFAULT_MAX_RSS_MB):
+        self.max_rss_mb = max_rss_mb
+        self._models = OrderedDict()
+        self._sizes_mb = {}
+        self._key_locks = {}
+        self._lock = threading.Lock()
+
+    def get(self, file_hash):
+        with self._lock:
+            model = self._models.get(file_hash)
+            if model is not None:
+                self._models.move_to_end(file_hash)
+            return model
+
+    def get_or_open(self, file_hash, file_path):
+        model = self.get(file_hash)
+        if model is not None:
+            return model
+
+        # One lock per hash so concurrent sessions uploading the same model parse it once.
+        with self._lock:
+            key_lock = self._key_locks.setdefault(file_hash, threading.Lock())
+        try:
+            with key_lock:
+                model = self.get(file_hash)
+                if model is None:
+                    logging.info(f"Parsing IFC model {file_hash[:12]}")
+                    import ifcopenshell
+                    file_mb = os.path.getsize(file_path) / (1024 * 1024)
+                    rss_before = self._rss_mb()
+                    with trace_stage("parse_ifc", file_hash=file_hash[:12], bytes=os.path.getsize(file_path)):
+                        model = ifcopenshell.open(file_path)
+                    self.put(file_hash, model, max(self._rss_mb() - rss_before, file_mb))
+        finally:
+            with self._lock:
+                self._key_locks.pop(file_hash, None)
+        return model
+
+    def put(self, file_hash, model, size_mb=0.0):
+        with self._lock:
+            self._models[file_hash] = model
+            self._models.move_to_end(file_hash)
+            self._sizes_mb[file_hash] = size_mb
+        self.evict()
+
+    def evict(self):
+        evicted = []
+        with self._lock:
+            while len(self._models) > 1 and sum(self._sizes_mb.values()) > self.max_rss_mb:
+                file_hash, _ = self._models.popitem(last=False)
+                self._sizes_mb.pop(file_hash, None)
+                evicted.append(file_hash)
+        for file_hash in evicted:
+            logging.info(f"Evicted IFC model {file_hash[:12]} from cache (budget {self.max_rss_mb} MB)")
+        if evicted:
+            gc.collect()
+
+    def clear(self):
+        with self._lock:
+            self._models.clear()
+            self._sizes_mb.clear()
+        gc.collect()
+
+    def __contains__(self, file_hash):
+        with self._lock:
+            return file_hash in self._models
+
+    def __len__(self):
+        with self._lock:
+            return len(self._models)
+
+    @staticmethod
+    def _rss_mb():
+        return psutil.Process().memory_info().rss / (1024 * 1024)
+
+
+# Module level so the cache lives for the whole server process and is shared across sessions and reruns.
+model_cache = ModelCache()
@@ -0,0 +1,216 @@
+import hashlib
+import json
+import logging
+import multiprocessing
+import os
+import threading
+from collections import OrderedDict
+from concurrent.futures import ProcessPoolExecutor
+
+import pandas as pd
+import ifcopenshell.util.placement
+
+from analysis_store import analysis_store
+from extraction import PropertyResolver
+from tracing import trace_stage
+
+FINGERPRINT_ASPECTS = ["Attributes", "Placement", "Type", "Container", "Properties"]
+CHANGE_TYPES = ["Added", "Removed", "Modified"]
+# Attributes hashed through their own aspect, or that change on every export without the element changing.
+SKIPPED_ATTRIBUTES = {"id", "GlobalId", "OwnerHistory", "ObjectPlacement", "Representation"}
+PLACEMENT_DECIMALS = 6
+FINGERPRINT_CACHE_SIZE = 16
+FINGERPRINT_WORKERS = int(os.environ.get('IFC_TOOL_FINGERPRINT_WORKERS', 2))
+
+
+def _digest(value):
+    return hashlib.blake2b(json.dumps(value, sort_keys=True, default=str).encode('utf-8'), digest_size=16).hexdigest()
+
+
+def _is_plain_value(value):
+    if isinstance(value, tuple):
+        return all(_is_plain_value(item) for item in value)
+    return not isinstance(value, ifcopenshell.entity_instance)
+
+
+def _attribute_values(element):
+    info = element.get_info(include_identifier=False, recursive=False)
+    return {name: value for name, value in info.items() if name not in SKIPPED_ATTRIBUTES and _is_plain_value(value)}
+
+
+def _placement_matrix(placement, matrices):
+    # Same product as get_local_placement, but storeys and spaces, which are the parents
+    # of most elements, are resolved once per model instead of once per element.
+    matrix = matrices.get(placement.id())
+    if matrix is None:
+        local = ifcopenshell.util.placement.get_axis2placement(placement.RelativePlacement)
+        parent = placement.PlacementRelTo
+        matrix = local if parent is None else _placement_matrix(parent, matrices) @ local
+        matrices[placement.id()] = matrix
+    return matrix
+
+
+def _placement(element, matrices):
+    placement = getattr(element, 'ObjectPlacement', None)
+    if placement is None:
+        return None
+    try:
+        matrix = _placement_matrix(placement, matrices)
+    except Exception:
+        return None
+    # Adding 0.0 turns -0.0 into 0.0 so rounding noise does not read as a move.
+    return (matrix.round(PLACEMENT_DECIMALS) + 0.0).tolist()
+
+
+def _without_ids(data):
+    # Property set ids are step ids, which are renumbered on every export; complex properties nest further sets.
+    if isinstance(data, dict):
+        return {key: _without_ids(value) for key, value in data.items() if key != 'id'}
+    if isinstance(data, (list, tuple)):
+        return [_without_ids(value) for value in data]
+    return data
+
+
+def _reference(entity):
+    if entity is None:
+        return None
+    return [entity.is_a(), getattr(entity, 'GlobalId', None), getattr(entity, 'Name', None)]
+
+
+def fingerprint_model(ifc_file, class_type='IfcProduct'):
+    elements = [element for element in ifc_file.by_type(class_type) if getattr(element, 'GlobalId', None)]
+    resolver = PropertyResolver(ifc_file, elements)
+    placement_matrices = {}
+    rows = {}
+    for element in elements:
+        global_id = element.GlobalId
+        if global_id in rows:
+            logging.warning(f"Duplicate GlobalId {global_id} in model; keeping the first occurrence")
+            continue
+        element_type = resolver.get_type(element)
+        aspects = [
+            _digest(_attribute_values(element)),
+            _digest(_placement(element, placement_matrices)),
+            _digest(_reference(element_type)),
+            _digest(_reference(resolver.index.get_container(element))),
+            _digest([_without_ids(resolver.get_psets(element, element_type)), _without_ids(resolver.get_qtos(element, element_type))]),
+        ]
+        rows[global_id] = [element.is_a(), getattr(element, 'Name', None), _digest(aspects)] + aspects
+    fingerprints = pd.DataFrame.from_dict(rows, orient='index', columns=["Class", "Name", "Fingerprint"] + FINGERPRINT_ASPECTS)
+    fingerprints.index.name = "GlobalId"
+    return fingerprints
+
+
+def fingerprint_ifc_file(file_path):
+    # Process pool entry point: parse and fingerprint in the worker, only the table travels back.
+    import ifcopenshell
+    return fingerprint_model(ifcopenshell.open(file_path))
+
+
+_fingerprint_pool = None
+_fingerprint_pool_lock = threading.Lock()
+
+
+def fingerprint_in_process(file_path):
+    """Future of the fingerprints of an IFC file that is parsed and fingerprinted in a worker process.
+
+    Parsing and fingerprinting hold the GIL, so two models only get done in parallel
+    in separate processes. Workers are spawned, since forking a process that runs
+    Streamlit's threads can deadlock, and each one exits after its model so the
+    memory of the parsed model goes back to the OS.
+    """
+    global _fingerprint_pool
+    with _fingerprint_pool_lock:
+        if _fingerprint_pool is None:
+            _fingerprint_pool = ProcessPoolExecutor(max_workers=FINGERPRINT_WORKERS, mp_context=multiprocessing.get_context('spawn'), max_tasks_per_child=1)
+        return _fingerprint_pool.submit(fingerprint_ifc_file, file_path)
+
+
+_fingerprint_cache = OrderedDict()
+_fingerprint_cache_lock = threading.Lock()
+
+
+def _cached_fingerprints(file_hash):
+    with _fingerprint_cache_lock:
+        fingerprints = _fingerprint_cache.get(file_hash)
+        if fingerprints is not None:
+            _fingerprint_cache.move_to_end(file_hash)
+        return fingerprints
+
+
+def _cache_fingerprints(file_hash, fingerprints):
+    with _fingerprint_cache_lock:
+        _fingerprint_cache[file_hash] = fingerprints
+        while len(_fingerprint_cache) > FINGERPRINT_CACHE_SIZE:
+            _fingerprint_cache.popitem(last=False)
+
+
+def _stored_fingerprints(file_hash):
+    fingerprints = _cached_fingerprints(file_hash)
+    if fingerprints is None:
+        table = analysis_store.load_table(file_hash, 'fingerprints', 'IfcProduct')
+        if table is not None:
+            fingerprints = table.set_index("GlobalId")
+            _cache_fingerprints(file_hash, fingerprints)
+    return fingerprints
+
+
+def save_fingerprints(file_hash, fingerprints):
+    _cache_fingerprints(file_hash, fingerprints)
+    analysis_store.save_table(file_hash, 'fingerprints', 'IfcProduct', fingerprints.reset_index())
+
+
+def load_fingerprints(file_hash, open_model=None):
+    # Memory, then the analysis store, then the model; returns None if only the model would do and open_model is not given.
+    fingerprints = _stored_fingerprints(file_hash)
+    if fingerprints is None and open_model is not None:
+        ifc_file = open_model()
+        with trace_stage("fingerprint_model", file_hash=file_hash[:12]):
+            fingerprints = fingerprint_model(ifc_file)
+        save_fingerprints(file_hash, fingerprints)
+    return fingerprints
+
+
+def diff_fingerprints(old, new):
+    joined = old.join(new, how='outer', lsuffix='_old', rsuffix='_new')
+    in_old = joined["Fingerprint_old"].notna()
+    in_new = joined["Fingerprint_new"].notna()
+    changed = in_old & in_new & (joined["Fingerprint_old"] != joined["Fingerprint_new"])
+
+    change = pd.Series(pd.NA, index=joined.index, dtype=object)
+    change[in_new & ~in_old] = "Added"
+    change[in_old & ~in_new] = "Removed"
+    change[changed] = "Modified"
+    joined = joined[change.notna()]
+    change = change[change.notna()]
+
+    changed_aspects = pd.Series("", index=joined.index, dtype=object)
+    for aspect in FINGERPRINT_ASPECTS:
+        differs = joined[f"{aspect}_old"] != joined[f"{aspect}_new"]
+        changed_aspects[(change == "Modified") & differs] += aspect + ", "
+
+    diff = pd.DataFrame({
+        "Change": pd.Categorical(change, categories=CHANGE_TYPES),
+        "Class": joined["Class_new"].fillna(joined["Class_old"]),
+        "Name": joined["Name_new"].fillna(joined["Name_old"]),
+        "ChangedAspects": changed_aspects.str.rstrip(", "),
+    }, index=joined.index)
+    return diff.reset_index().sort_values(["Change", "Class", "GlobalId"], ignore_index=True)
+
+
+def summarize_diff(diff):
+    summary = diff.groupby(["Class", "Change"], observed=False).size().unstack("Change", fill_value=0)
+    return summary.reindex(columns=CHANGE_TYPES, fill_value=0).loc[lambda table: table.sum(axis=1) > 0].reset_index()
+
+
+def load_diff_summary(old_hash, new_hash):
+    # Per-class change counts between two stored revisions, kept with the newer one.
+    summary = analysis_store.load_table(new_hash, 'diff_summary', old_hash)
+    if summary is None:
+        old, new = load_fingerprints(old_hash), load_fingerprints(new_hash)
+        if old is None or new is None:
+            return None
+        with trace_stage("diff_fingerprints", old=old_hash[:12], new=new_hash[:12]):
+            summary = summarize_diff(diff_fingerprints(old, new))
+        analysis_store.save_table(new_hash, 'diff_summary', old_hash, summary)
+    return summary
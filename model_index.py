@@ -0,0 +1,116 @@
+import threading
+from collections import Counter, defaultdict
+from datetime import datetime
+
+
+class ModelSummary:
+    """The parts of a ModelIndex that can be stored and used without the parsed model."""
+
+    def __init__(self, project_metadata, component_count, name_prefix_counts, subclasses):
+        self.project_metadata = project_metadata
+        self.component_count = Counter(component_count)
+        self.name_prefix_counts = defaultdict(Counter, {ifc_class: Counter(counts) for ifc_class, counts in name_prefix_counts.items()})
+        # product class -> product classes present in the model that by_type() would include for it
+        self.subclasses = subclasses
+
+    def classes_of(self, product_type):
+        return self.subclasses.get(product_type, [])
+
+    def count_by_name_prefix(self, product_type):
+        counts = Counter()
+        for ifc_class in self.classes_of(product_type):
+            counts.update(self.name_prefix_counts[ifc_class])
+        return counts
+
+
+class ModelIndex:
+    """Everything the analysis pages need from a model, gathered in one pass over its products."""
+
+    def __init__(self, ifc_file):
+        self.project_metadata = self._read_project_metadata(ifc_file)
+        self.component_count = Counter()
+        self.name_prefix_counts = defaultdict(Counter)
+        self.containers = {}
+        self.types = {}
+        self._parents = {}
+        self._class_samples = {}
+
+        for product in ifc_file.by_type('IfcProduct'):
+            ifc_class = product.is_a()
+            self.component_count[ifc_class] += 1
+            product_name = product.Name if product.Name else "Unnamed"
+            self.name_prefix_counts[ifc_class][product_name.split(':')[0]] += 1
+            self._class_samples.setdefault(ifc_class, product)
+
+        for rel in ifc_file.by_type('IfcRelContainedInSpatialStructure'):
+            for element in rel.RelatedElements or ():
+                self.containers[element.id()] = rel.RelatingStructure
+        for rel in ifc_file.by_type('IfcRelDefinesByType'):
+            for element in rel.RelatedObjects or ():
+                self.types[element.id()] = rel.RelatingType
+        for rel_class in ('IfcRelAggregates', 'IfcRelNests'):
+            for rel in ifc_file.by_type(rel_class):
+                for element in rel.RelatedObjects or ():
+                    self._parents.setdefault(element.id(), rel.RelatingObject)
+
+    @staticmethod
+    def _read_project_metadata(ifc_file):
+        projects = ifc_file.by_type('IfcProject')
+        if not projects:
+            return {}
+        project = projects[0]
+        creation_date = getattr(project, 'CreationDate', None)
+        return {
+            "Name": project.Name,
+            "Description": project.Description,
+            "Phase": getattr(project, 'Phase', None),
+            "CreationDate": datetime.fromtimestamp(creation_date) if creation_date else 'Not available',
+        }
+
+    def classes_of(self, product_type):
+        # by_type() semantics: the class itself plus every subclass present in the model.
+        return [ifc_class for ifc_class, sample in self._class_samples.items() if sample.is_a(product_type)]
+
+    def count_by_name_prefix(self, product_type):
+        counts = Counter()
+        for ifc_class in self.classes_of(product_type):
+            counts.update(self.name_prefix_counts[ifc_class])
+        return counts
+
+    def summary(self):
+        return ModelSummary(
+            self.project_metadata,
+            self.component_count,
+            self.name_prefix_counts,
+            {ifc_class: self.classes_of(ifc_class) for ifc_class in self.component_count},
+        )
+
+    def get_container(self, element):
+        # Mirrors ifcopenshell.util.element.get_container: parts of aggregates and nests inherit the container of their whole.
+        element_id = element.id()
+        seen = set()
+        while element_id not in self.containers:
+            parent = self._parents.get(element_id)
+            if parent is None or element_id in seen:
+                return None
+            seen.add(element_id)
+            element_id = parent.id()
+        return self.containers[element_id]
+
+    def get_type(self, element):
+        return self.types.get(element.id())
+
+
+_index_lock = threading.Lock()
+
+
+def get_model_index(ifc_file):
+    # Stored on the model itself so the index is freed together with it when model_cache evicts the model.
+    index = getattr(ifc_file, '_analysis_index', None)
+    if index is None:
+        with _index_lock:
+            index = getattr(ifc_file, '_analysis_index', None)
+            if index is None:
+                index = ModelIndex(ifc_file)
+                ifc_file._analysis_index = index
+    return index
@@ -1,10 +1,8 @@
 import streamlit as st
-import pandas as pd
 import logging
-import os
-import plotly.graph_objects as go  # Importing plotly.graph_objects
-from utils import handle_file_upload, process_ifc_file, read_excel
-from analysis import display_metadata, count_building_components, detailed_analysis, visualize_component_count, generate_insights, export_analysis_to_pdf, get_objects_data_by_class, get_attribute_value, visualize_data, compare_ifc_files
+from model_cache import file_content_hash
+from tracing import trace_stage
+from utils import handle_file_upload, read_excel, read_excel_layout, plotly_chart, scratch_file, paginated_table
 
 # Initialize logging
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
@@ -22,6 +20,8 @@ def welcome_page():
     - **Excel File Analysis:** Upload and analyze Excel spreadsheets to select and visualize data columns, and generate insights from the data.
     - **IFC File Comparison:** Compare the components of two IFC files to identify differences and view detailed and overall comparison charts.
     - **Detailed Object Data Extraction:** Extract and display detailed object data from IFC files, including property sets and quantity sets.
+    - **Revision Timeline:** Track element counts and added, removed and modified elements across any number of revisions of a model. Each revision is processed once.
+    - **Schedule Reconciliation:** Match the rows of an Excel cost or quantity schedule to the objects of an IFC model by GlobalId or another key, and list the rows that are missing or whose values differ.
 
     #### License:
     This project is licensed under the GNU General Public License v3.0. For more details, see the LICENSE file in the root directory of this source tree or visit [GNU General Public License v3.0](https://www.gnu.org/licenses/gpl-3.0.en.html).
@@ -31,6 +31,7 @@ def welcome_page():
     """)
 
 def ifc_file_analysis():
+    import analysis
     st.write("""
     ### Instructions for Analyzing IFC Files:
 
@@ -45,24 +46,17 @@ def ifc_file_analysis():
     5. **Export Analysis as PDF:** Click the "Export Analysis as PDF" button to download a PDF report of the analysis.
     """)
 
-    file_path, file_name = handle_file_upload("IFC", ['ifc'])
-    if file_path:
-        with st.spinner('Processing IFC file...'):
-            ifc_file = process_ifc_file(file_path)
-            if ifc_file:
-                display_metadata(ifc_file)
-                component_count = count_building_components(ifc_file)
+    with handle_file_upload("IFC", ['ifc']) as (file_path, file_name):
+        if file_path:
+            model_summary = analysis.load_model_summary(file_path)
+            if model_summary:
+                ifc_metadata = model_summary.project_metadata
+                analysis.display_metadata(ifc_metadata)
+                component_count = model_summary.component_count
                 chart_type = st.radio("Chart Type", options=['Bar Chart', 'Pie Chart'], key="chart")
-                fig = visualize_component_count(component_count, chart_type)
-                st.plotly_chart(fig)
-                detailed_analysis_ui(ifc_file)
-
-                ifc_metadata = {
-                    "Name": ifc_file.by_type('IfcProject')[0].Name,
-                    "Description": ifc_file.by_type('IfcProject')[0].Description,
-                    "Phase": ifc_file.by_type('IfcProject')[0].Phase,
-                    "CreationDate": datetime.fromtimestamp(ifc_file.by_type('IfcProject')[0].CreationDate) if hasattr(ifc_file.by_type('IfcProject')[0], 'CreationDate') else 'Not available'
-                }
+                fig = analysis.visualize_component_count(component_count, chart_type)
+                plotly_chart(fig)
+                detailed_analysis_ui(model_summary, component_count)
 
                 figs = [fig]
 
@@ -72,43 +66,81 @@ def ifc_file_analysis():
                 cover_text = st.text_area("Cover Page Text", value="This report contains the analysis of IFC and Excel files. The following sections include metadata, component counts, and visualizations of the data.")
 
                 if st.button("Export Analysis as PDF"):
-                    pdf_file_path = export_analysis_to_pdf(ifc_metadata, component_count, figs, author, subject, cover_text)
-                    with open(pdf_file_path, 'rb') as f:
-                        st.download_button('Download PDF Report', f, file_name.replace('.ifc', '.pdf'))
-            os.remove(file_path)
+                    pdf_bytes = analysis.export_analysis_to_pdf(ifc_metadata, component_count, figs, author, subject, cover_text)
+                    st.download_button('Download PDF Report', pdf_bytes, file_name.replace('.ifc', '.pdf'), mime='application/pdf')
+
+def diagnostics_panel(trace):
+    import pandas as pd
+    st.sidebar.markdown("#### Diagnostics")
+    spans = trace.spans()
+    if not spans:
+        st.sidebar.write("No stages recorded yet.")
+        return
+    spans_df = pd.DataFrame(spans)
+    columns = [column for column in ["stage", "wall_ms", "cpu_ms", "rss_delta_mb", "rss_mb", "error"] if column in spans_df.columns]
+    st.sidebar.dataframe(spans_df[columns].iloc[::-1], hide_index=True)
+    totals = spans_df.groupby("stage")["wall_ms"].agg(["count", "sum", "max"]).sort_values("sum", ascending=False)
+    st.sidebar.write("Time per stage (ms)", totals)
+    st.sidebar.download_button("Download trace (JSON)", trace.to_json(), file_name=f"trace_{trace.session_id}.json", mime="application/json")
+    if st.sidebar.button("Clear trace"):
+        trace.clear()
+
+def detailed_analysis_ui(model_summary, component_count):
+    import analysis
+    with st.expander("Show Detailed Component Analysis"):
+        product_types = sorted(component_count.keys())
+        if product_types:
+            product_type = st.selectbox("Select a product type for detailed analysis", product_types, key="product_type")
+            sort_by = st.selectbox("Sort by", ["Count", "Type"], key="sort_by")
+            analysis.detailed_analysis(model_summary, product_type, sort_by)
+        else:
+            st.write("No building components found in this file.")
 
 def excel_file_analysis():
+    import analysis
     st.write("""
     ### Instructions for Analyzing Excel Files:
 
     1. **Upload an Excel File:** Click on the "Choose an Excel file" button to upload an Excel spreadsheet.
 
-    2. **Select Columns to Display:** Choose the columns you want to display from the uploaded Excel file.
+    2. **Select Sheet and Columns to Load:** Pick the worksheet and the columns you need. Only these are read from the file, and the parsed data is cached so later interactions do not read the workbook again.
+
+    3. **Select Columns to Display:** Choose the columns you want to display from the uploaded Excel file.
 
-    3. **Visualize Data:** Click on "Visualize Data" to generate charts for the selected columns.
+    4. **Visualize Data:** Choose a chart style and click on "Visualize Data" to generate charts for the selected columns. "Distribution" shows a histogram for numeric columns and the most frequent values for text columns. "Series" plots numeric columns in row order, downsampled to a few thousand points.
 
-    4. **Generate Insights:** Click on "Generate Insights" to view descriptive statistics and other insights from the data.
+    5. **Generate Insights:** Click on "Generate Insights" to view descriptive statistics and other insights from the data.
     """)
 
-    file_path, _ = handle_file_upload("Excel", ['xlsx'])
-    if file_path:
-        df = read_excel(file_path)
-        if not df.empty:
-            selected_columns = st.multiselect("Select columns to display", df.columns.tolist(), default=df.columns.tolist(), key="columns")
-            if selected_columns:
-                st.dataframe(df[selected_columns])
-                figs = []
-                if st.button("Visualize Data", key="visualize"):
-                    figs = visualize_data(df, selected_columns)
-                if st.button("Generate Insights", key="insights"):
-                    generate_insights(df)
-                if figs and st.button("Export Analysis as PDF"):
-                    pdf_file_path = export_analysis_to_pdf({"Name": "Excel Data Analysis"}, {}, figs, "Author Name", "Excel Data Analysis Report", "This report contains the analysis of Excel data.")
-                    with open(pdf_file_path, 'rb') as f:
-                        st.download_button('Download PDF Report', f, 'excel_analysis.pdf')
-            os.remove(file_path)
+    with handle_file_upload("Excel", ['xlsx']) as (file_path, _):
+        if file_path:
+            layout = read_excel_layout(file_path)
+            if not layout:
+                return
+            sheet_name = st.selectbox("Select sheet", list(layout), key="excel_sheet")
+            header = layout[sheet_name]
+            columns_to_load = st.multiselect("Select columns to load", header, default=header, key="excel_load_columns")
+            if not columns_to_load:
+                return
+            df = read_excel(file_path, sheet_name, columns_to_load)
+            if not df.empty:
+                selected_columns = st.multiselect("Select columns to display", df.columns.tolist(), default=df.columns.tolist(), key="columns")
+                if selected_columns:
+                    paginated_table(df, "excel_table", data_version=(file_content_hash(file_path), sheet_name, tuple(columns_to_load)), columns=selected_columns)
+                    figs = []
+                    chart_style = st.radio("Chart Style", options=['Distribution', 'Series'], key="chart_style", horizontal=True)
+                    if st.button("Visualize Data", key="visualize"):
+                        figs = analysis.visualize_data(df, selected_columns, chart_style)
+                    if st.button("Generate Insights", key="insights"):
+                        analysis.generate_insights(df)
+                    if figs and st.button("Export Analysis as PDF"):
+                        pdf_bytes = analysis.export_analysis_to_pdf({"Name": "Excel Data Analysis"}, {}, figs, "Author Name", "Excel Data Analysis Report", "This report contains the analysis of Excel data.")
+                        st.download_button('Download PDF Report', pdf_bytes, 'excel_analysis.pdf', mime='application/pdf')
 
 def compare_ifc_files_ui():
+    import plotly.graph_objects as go
+    import analysis
+    import analysis_core
     st.title("Compare IFC Files")
     st.write("""
     ### Instructions for Comparing IFC Files:
@@ -125,18 +157,18 @@ def compare_ifc_files_ui():
 
     4. **View Overall Comparison:** After selecting a specific component type, you can also choose to view an overall comparison of all components by clicking the **"Show Overall Comparison"** button. This will display a pie chart visualizing the proportion of differences across all component types, giving you a comprehensive overview of how the two IFC files differ.
 
+    5. **Review Element-Level Changes:** Below the count comparison, every element is matched by its GlobalId. Elements only in the second file are listed as added, elements only in the first file as removed, and elements whose attributes, placement, type, level or property sets differ as modified.
+
     This step-by-step process will help you understand the detailed differences in building components between the two IFC files, as well as provide an overall summary of the differences.
     """)
 
-    file_path1, file_name1 = handle_file_upload("first IFC", ['ifc'])
-    file_path2, file_name2 = handle_file_upload("second IFC", ['ifc'])
-
-    if file_path1 and file_path2:
-        with st.spinner('Processing IFC files...'):
-            ifc_file1 = process_ifc_file(file_path1)
-            ifc_file2 = process_ifc_file(file_path2)
-            if ifc_file1 and ifc_file2:
-                comparison_result = compare_ifc_files(ifc_file1, ifc_file2)
+    with handle_file_upload("first IFC", ['ifc']) as (file_path1, file_name1), handle_file_upload("second IFC", ['ifc']) as (file_path2, file_name2):
+        if file_path1 and file_path2:
+            # Counts come from the stored model summaries, so a model compared before is not parsed again.
+            model_summary1 = analysis.load_model_summary(file_path1)
+            model_summary2 = analysis.load_model_summary(file_path2)
+            if model_summary1 and model_summary2:
+                comparison_result = analysis_core.compare_component_counts(model_summary1.component_count, model_summary2.component_count)
                 all_component_types = list(comparison_result.keys())
                 selected_component = st.selectbox("Select a component type for detailed comparison:", all_component_types, key="component_type")
 
@@ -149,25 +181,202 @@ def compare_ifc_files_ui():
                         go.Bar(name='Difference', x=[selected_component], y=[component_data['Difference']], marker_color='lightslategray')
                     ])
                     fig.update_layout(barmode='group', title_text=f'Comparison of {selected_component} in {file_name1} and {file_name2}', xaxis_title="Component Type", yaxis_title="Count", paper_bgcolor='white', plot_bgcolor='white', font_color='black')
-                    st.plotly_chart(fig)
+                    plotly_chart(fig)
                     figs.append(fig)
 
                     if st.button("Show Overall Comparison"):
                         differences = [comparison_result[comp]['Difference'] for comp in all_component_types]
                         fig_pie = go.Figure(data=[go.Pie(labels=all_component_types, values=differences, title=f'Overall Differences in Components between {file_name1} and {file_name2}')])
                         fig_pie.update_layout(paper_bgcolor='white', plot_bgcolor='white', font_color='black')
-                        st.plotly_chart(fig_pie)
+                        plotly_chart(fig_pie)
                         figs.append(fig_pie)
 
+                tables = []
+                diff_summary, diff_fig = element_level_comparison_ui(file_path1, file_path2, file_name1, file_name2)
+                if diff_summary is not None:
+                    tables.append(("Element-Level Changes", diff_summary))
+                    figs.append(diff_fig)
+
                 if figs and st.button("Export Analysis as PDF"):
-                    pdf_file_path = export_analysis_to_pdf({"Name": "IFC Files Comparison"}, {}, figs, "Author Name", "IFC Files Comparison Report", "This report contains the comparison analysis of two IFC files.")
-                    with open(pdf_file_path, 'rb') as f:
-                        st.download_button('Download PDF Report', f, 'ifc_comparison.pdf')
+                    pdf_bytes = analysis.export_analysis_to_pdf({"Name": "IFC Files Comparison"}, {}, figs, "Author Name", "IFC Files Comparison Report", "This report contains the comparison analysis of two IFC files.", tables=tables)
+                    st.download_button('Download PDF Report', pdf_bytes, 'ifc_comparison.pdf', mime='application/pdf')
+
+
+def element_level_comparison_ui(file_path1, file_path2, file_name1, file_name2):
+    import analysis
+    import model_diff
+    st.subheader("Element-Level Changes")
+    diff = analysis.compare_ifc_elements(file_path1, file_path2)
+    if diff is None:
+        return None, None
+    if diff.empty:
+        st.write(f"No added, removed or modified elements between {file_name1} and {file_name2}.")
+        return None, None
+
+    change_counts = diff["Change"].value_counts()
+    for column, change in zip(st.columns(3), ["Added", "Removed", "Modified"]):
+        column.metric(change, int(change_counts.get(change, 0)))
+
+    diff_summary = model_diff.summarize_diff(diff)
+    fig = analysis.visualize_element_diff(diff_summary, f'Element changes from {file_name1} to {file_name2}')
+    plotly_chart(fig)
+
+    selected_changes = st.multiselect("Show changes", ["Added", "Removed", "Modified"], default=["Modified"], key="diff_changes")
+    st.dataframe(diff[diff["Change"].isin(selected_changes)])
+    return diff_summary, fig
+
+def schedule_reconciliation_ui():
+    import analysis
+    import schedule_join
+    st.title("Reconcile Schedule with IFC Model")
+    st.write("""
+    ### Instructions for Reconciling a Schedule:
 
-            os.remove(file_path1)
-            os.remove(file_path2)
+    1. **Upload an IFC File and an Excel Schedule:** The model's objects are extracted once in the background. The schedule is read from the selected worksheet.
+
+    2. **Choose the Keys:** Pick the schedule column and the model column to match rows on, e.g. GlobalId, or Name or Type for schedules without GUIDs. When a key is shared by several model objects, the schedule row is compared with all of them together: numbers are summed, and "Object count" holds the number of objects.
+
+    3. **Choose Columns to Compare:** For each schedule column, pick the model column (attribute, property or quantity) that should hold the same value. Numbers are compared with the given relative tolerance, text is compared ignoring case and surrounding spaces.
+
+    4. **Review the Result:** Each row is reported as matched, mismatched (with the columns that differ), only in the schedule, only in the model, or as having a key that is missing or repeated in the schedule. The result can be downloaded as CSV.
+    """)
+
+    with handle_file_upload("IFC", ['ifc']) as (ifc_path, _), handle_file_upload("Excel", ['xlsx']) as (excel_path, _):
+        if not (ifc_path and excel_path):
+            return
+        model_summary = analysis.load_model_summary(ifc_path)
+        objects = analysis.load_products_dataframe(ifc_path) if model_summary else None
+        layout = read_excel_layout(excel_path)
+        if objects is None or not layout:
+            return
+        sheet_name = st.selectbox("Select sheet", list(layout), key="schedule_sheet")
+        schedule = read_excel(excel_path, sheet_name)
+        if schedule.empty:
+            return
+
+        schedule_columns = schedule.columns.tolist()
+        model_columns = objects.columns.tolist()
+        key_columns = st.columns(2)
+        schedule_key = key_columns[0].selectbox("Schedule key column", schedule_columns, index=schedule_columns.index('GlobalId') if 'GlobalId' in schedule_columns else 0, key="schedule_key")
+        model_key = key_columns[1].selectbox("Model key column", model_columns, index=model_columns.index('GlobalId'), key="schedule_model_key")
+
+        compared = st.multiselect("Schedule columns to compare", [column for column in schedule_columns if column != schedule_key], key="schedule_compare")
+        column_pairs = []
+        compared_columns = model_columns + [schedule_join.OBJECT_COUNT_COLUMN]
+        for schedule_column in compared:
+            default = compared_columns.index(schedule_column) if schedule_column in compared_columns else 0
+            model_column = st.selectbox(f"Model column for '{schedule_column}'", compared_columns, index=default, key=f"schedule_pair_{schedule_column}")
+            column_pairs.append((schedule_column, model_column))
+        rtol = st.number_input("Relative tolerance for numbers", min_value=0.0, max_value=1.0, value=0.001, step=0.001, format="%.4f", key="schedule_rtol")
+
+        signature, result = analysis.reconcile_schedule(excel_path, sheet_name, schedule, schedule_key, ifc_path, objects, model_key, column_pairs, rtol)
+
+        status_counts = schedule_join.summarize_join(result)
+        for column, (status, count) in zip(st.columns(len(status_counts)), status_counts.items()):
+            column.metric(status, int(count))
+
+        selected_statuses = st.multiselect("Show rows", schedule_join.JOIN_STATUSES, default=[status for status in schedule_join.JOIN_STATUSES if status != "Matched"], key="schedule_statuses")
+        paginated_table(result[result["Status"].isin(selected_statuses)], "schedule_table", data_version=(signature, tuple(selected_statuses)))
+        if st.button("Export reconciliation"):
+            with st.spinner('Writing export file...'), scratch_file(suffix='.csv') as export_path:
+                analysis.export_reconciliation(result, export_path)
+                with open(export_path, 'rb') as export_file:
+                    st.download_button(
+                        label="Download reconciliation as CSV",
+                        data=export_file,
+                        file_name='schedule_reconciliation.csv',
+                        mime='text/csv',
+                    )
+
+def revision_timeline_ui():
+    import pandas as pd
+    import analysis
+    import revision_timeline
+    st.title("Revision Timeline")
+    st.write("""
+    ### Instructions for Tracking Model Revisions:
+
+    1. **Choose a Timeline:** Pick a saved timeline or type a new name. Timelines are saved on the server, so next week's comparison only needs the new revision.
+
+    2. **Add a Revision:** Upload the IFC file of a revision and give it a label (e.g. a date or issue code). Its class counts and element fingerprints are computed once in the background and stored by file content, so revisions that were processed before are added instantly. Click "Add to timeline" when processing has finished.
+
+    3. **Review the Trends:** The charts show the element count of the selected classes in each revision and the number of elements added, removed and modified from one revision to the next.
+
+    4. **Export Analysis as PDF:** The trend charts and tables can be exported as a PDF report.
+    """)
+
+    saved_timelines = revision_timeline.list_timelines()
+    timeline_name = st.selectbox("Timeline", saved_timelines + ["New timeline..."], key="timeline_choice")
+    if timeline_name == "New timeline...":
+        timeline_name = st.text_input("Timeline name", key="timeline_new_name").strip()
+        if not timeline_name:
+            return
+    revisions = revision_timeline.load_timeline(timeline_name)
+
+    with handle_file_upload("revision IFC", ['ifc']) as (file_path, file_name):
+        if file_path:
+            # Keyed by file content, so the label of the previous upload is not carried over.
+            label = st.text_input("Revision label", value=file_name.rsplit('.', 1)[0], key=f"timeline_label_{file_content_hash(file_path)}")
+            revision = analysis.load_revision(file_path)
+            if revision is not None:
+                file_hash, _ = revision
+                if any(existing["file_hash"] == file_hash for existing in revisions):
+                    st.info(f"{file_name} is already part of this timeline.")
+                elif any(existing["label"] == label for existing in revisions):
+                    st.warning(f"The label {label} is already used in this timeline; choose another one.")
+                elif st.button("Add to timeline"):
+                    revisions.append(revision_timeline.new_revision(label, file_name, file_hash))
+                    revision_timeline.save_timeline(timeline_name, revisions)
+                    st.success(f"Added {label} to {timeline_name}.")
+
+    if not revisions:
+        st.write("No revisions in this timeline yet.")
+        return
+
+    summaries = revision_timeline.revision_summaries(revisions)
+    st.dataframe(pd.DataFrame([{
+        "Label": revision["label"],
+        "File": revision["file_name"],
+        "Added": revision["added_at"],
+        "Elements": sum(summary.component_count.values()) if summary is not None else None,
+        "Status": "Stored" if summary is not None else "Evicted from store, upload again",
+    } for revision, summary in zip(revisions, summaries)]), hide_index=True)
+    removed = st.multiselect("Remove revisions", [revision["label"] for revision in revisions], key="timeline_remove")
+    if removed and st.button("Remove selected revisions"):
+        revision_timeline.save_timeline(timeline_name, [revision for revision in revisions if revision["label"] not in removed])
+        st.rerun()
+
+    counts = revision_timeline.class_count_matrix(revisions, summaries)
+    if counts.empty:
+        return
+    default_classes = counts.max(axis=1).sort_values(ascending=False).index[:10].tolist()
+    selected_classes = st.multiselect("Classes to chart", counts.index.tolist(), default=default_classes, key="timeline_classes")
+    figs = []
+    if selected_classes:
+        trend_fig = analysis.visualize_class_trends(counts, selected_classes, f"Element counts per revision in {timeline_name}")
+        plotly_chart(trend_fig)
+        figs.append(trend_fig)
+
+    tables = [("Element Counts per Revision", counts.reset_index())]
+    with trace_stage("revision_changes", revisions=len(revisions)):
+        changes, missing_steps = revision_timeline.revision_changes(revisions)
+    if missing_steps:
+        st.warning(f"Changes are missing for {', '.join(missing_steps)}: a revision was evicted from the store. Upload it again to restore them.")
+    if not changes.empty:
+        changes_fig = analysis.visualize_element_diff(changes, f"Element changes between revisions of {timeline_name}", x='Step', xaxis_title="Revision")
+        plotly_chart(changes_fig)
+        figs.append(changes_fig)
+        tables.append(("Changes between Revisions", changes))
+    st.subheader("Element Counts per Revision")
+    st.dataframe(counts)
+
+    if figs and st.button("Export Analysis as PDF", key="timeline_pdf"):
+        pdf_bytes = analysis.export_analysis_to_pdf({"Name": f"Revision Timeline: {timeline_name}"}, {}, figs, "Author Name", "IFC Revision Timeline Report", f"This report tracks element counts and changes across {len(revisions)} revisions of {timeline_name}.", tables=tables)
+        st.download_button('Download PDF Report', pdf_bytes, 'revision_timeline.pdf', mime='application/pdf')
 
 def display_detailed_object_data():
+    import analysis
+    import analysis_core
     try:
         st.markdown("""
         ## Instructions for Using the IFC File Processor
@@ -175,11 +384,11 @@ def display_detailed_object_data():
         1. **Upload an IFC File**:
         - Use the "Choose an IFC file" button to upload your IFC file. This file should be in the `.ifc` format.
 
-        2. **Select Class Type**:
-        - After uploading the IFC file, select the class type of objects you want to analyze from the dropdown menu. The dropdown will be populated with all unique class types present in the uploaded IFC file.
+        2. **Select Class Types and Levels**:
+        - After uploading the IFC file, select one or more product classes (e.g. IfcWall, IfcDoor) and, optionally, levels. The data of all products is extracted once, so changing the selection only filters the table and does not read the IFC file again. Leave a filter empty to show everything.
 
         3. **View Object Data**:
-        - The app will display a table containing detailed information about the objects of the selected class type. This table includes attributes like `ExpressId`, `GlobalId`, `Class`, `PredefinedType`, `Name`, `Level`, and `Type`, along with any property sets and quantity sets associated with the objects.
+        - The app will display a table containing detailed information about the objects of the selected classes and levels. The table is shown one page at a time; use "Filter and sort" to narrow it down by any column, and "Columns to show" to pick columns. This table includes attributes like `ExpressId`, `GlobalId`, `Class`, `PredefinedType`, `Name`, `Level`, and `Type`, along with any property sets and quantity sets associated with the objects.
 
         **Explanation**:
         - **ExpressId**: The internal identifier of the object in the IFC file.
@@ -191,6 +400,8 @@ def display_detailed_object_data():
         - **Type**: The specific type of the object.
         - **PropertySets** and **QuantitySets**: These columns contain various properties and quantities associated with the objects, respectively.
 
+        - Tick **Compute geometry quantities** to add the volume, surface area, footprint area and bounding box size of each element, computed from its geometry. This is useful for models without quantity sets. It runs once per model in the background, and the results are cached.
+
         4. **View Floor and Type Summary**:
         - Below the detailed table, you will see another table that shows the total count of each type of object per floor. This table is grouped by `Level` and `Type`.
 
@@ -198,45 +409,41 @@ def display_detailed_object_data():
         - This summary helps you understand how many objects of each type are present on each floor. For example, it will show you how many beams, walls, or windows are on each level of the building.
 
         5. **Download Data**:
-        - You can download the detailed object data as a CSV file by clicking the "Download data as CSV" button. This allows you to further analyze the data offline or integrate it with other tools.
+        - Choose CSV or Parquet and click "Export object data" to download the displayed object data. The file is written in chunks, so large tables can be exported without holding a second copy in memory. Parquet files are compressed and keep numeric property columns numeric. This allows you to further analyze the data offline or integrate it with other tools.
         """)
 
-        file_path, file_name = handle_file_upload("IFC", ['ifc'])
-        if file_path:
-            with st.spinner('Processing IFC file...'):
-                ifc_file = process_ifc_file(file_path)
-                if ifc_file:
-                    all_classes = set(entity.is_a() for entity in ifc_file)
-                    class_type = st.selectbox('Select Class Type', sorted(all_classes))
-
-                    data, pset_attributes = get_objects_data_by_class(ifc_file, class_type)
-                    attributes = ["ExpressId", "GlobalId", "Class", "PredefinedType", "Name", "Level", "Type"] + pset_attributes
+        with handle_file_upload("IFC", ['ifc']) as (file_path, file_name):
+            if file_path:
+                model_summary = analysis.load_model_summary(file_path)
+                objects = analysis.load_products_dataframe(file_path) if model_summary else None
+                if objects is not None:
+                    product_classes = sorted(model_summary.component_count)
+                    selected_classes = st.multiselect('Select Class Types', product_classes, default=product_classes[:1], key="detail_classes")
+                    levels = sorted(level for level in objects['Level'].dropna().unique() if level)
+                    selected_levels = st.multiselect('Select Levels', levels, key="detail_levels")
 
-                    pandas_data = []
-                    for object_data in data:
-                        row = [get_attribute_value(object_data, attribute) for attribute in attributes]
-                        pandas_data.append(tuple(row))
-
-                    dataframe = pd.DataFrame.from_records(pandas_data, columns=attributes)
+                    compute_geometry = st.checkbox("Compute geometry quantities (volume, area, footprint, bounding box)", key="detail_geometry")
 
+                    geometry = analysis.load_geometry_quantities(file_path) if compute_geometry else None
+                    dataframe = analysis.filter_products(file_path, objects, selected_classes, selected_levels, geometry)
                     st.subheader("Detailed Object Data")
-                    st.write(dataframe)
+                    paginated_table(dataframe, "detail_table", data_version=(file_content_hash(file_path), tuple(selected_classes), tuple(selected_levels), geometry is not None))
 
                     st.subheader("Summary by Floor and Type")
-                    if 'Level' in dataframe.columns and 'Type' in dataframe.columns:
-                        floor_type_counts = dataframe.groupby(['Level', 'Type']).size().reset_index(name='Count')
-                        st.write(floor_type_counts)
-                    else:
-                        st.write("Columns 'Level' and 'Type' not found in the data.")
-
-                    st.download_button(
-                        label="Download data as CSV",
-                        data=dataframe.to_csv(index=False).encode('utf-8'),
-                        file_name='ifc_data.csv',
-                        mime='text/csv',
-                    )
-
-                    os.remove(file_path)
+                    st.write(analysis_core.summarize_by_level_and_type(dataframe))
+
+                    export_format = st.radio("Export format", ['CSV', 'Parquet'], key="detail_export_format", horizontal=True)
+                    if st.button("Export object data"):
+                        table_format = export_format.lower()
+                        with st.spinner('Writing export file...'), scratch_file(suffix=f'.{table_format}') as export_path:
+                            analysis.export_objects(dataframe, export_path, table_format)
+                            with open(export_path, 'rb') as export_file:
+                                st.download_button(
+                                    label=f"Download data as {export_format}",
+                                    data=export_file,
+                                    file_name=f'ifc_data.{table_format}',
+                                    mime='text/csv' if table_format == 'csv' else 'application/vnd.apache.parquet',
+                                )
     except Exception as e:
         logging.error(f"Error in display_detailed_object_data: {e}")
         st.error(f"Error in display_detailed_object_data: {e}")
@@ -0,0 +1,89 @@
+import hashlib
+import json
+import logging
+import os
+import tempfile
+from datetime import datetime
+
+import pandas as pd
+
+from analysis_store import STORE_DIR, analysis_store
+from model_diff import CHANGE_TYPES, load_diff_summary
+
+# Timelines only hold labels and content hashes; the per-revision results live in the analysis store.
+TIMELINE_DIR = os.environ.get('IFC_TOOL_TIMELINE_DIR', os.path.join(os.path.dirname(STORE_DIR), 'timelines'))
+
+
+def _timeline_path(name):
+    return os.path.join(TIMELINE_DIR, hashlib.sha256(name.encode('utf-8')).hexdigest()[:16] + '.json')
+
+
+def list_timelines():
+    if not os.path.isdir(TIMELINE_DIR):
+        return []
+    names = []
+    for entry in os.scandir(TIMELINE_DIR):
+        if entry.name.endswith('.json'):
+            try:
+                with open(entry.path) as f:
+                    names.append(json.load(f)["name"])
+            except (OSError, ValueError, KeyError) as e:
+                logging.warning(f"Ignoring unreadable timeline {entry.path}: {e}")
+    return sorted(names)
+
+
+def load_timeline(name):
+    path = _timeline_path(name)
+    if not os.path.exists(path):
+        return []
+    with open(path) as f:
+        return json.load(f)["revisions"]
+
+
+def save_timeline(name, revisions):
+    os.makedirs(TIMELINE_DIR, exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(suffix='.tmp', dir=TIMELINE_DIR)
+    with os.fdopen(fd, 'w') as f:
+        json.dump({"name": name, "revisions": revisions}, f, indent=2)
+    os.replace(tmp_path, _timeline_path(name))
+
+
+def new_revision(label, file_name, file_hash):
+    return {"label": label, "file_name": file_name, "file_hash": file_hash, "added_at": datetime.now().isoformat(timespec='seconds')}
+
+
+def revision_summaries(revisions):
+    # None for revisions whose results were evicted from the store; those have to be uploaded again.
+    return [analysis_store.load_summary(revision["file_hash"]) for revision in revisions]
+
+
+def class_count_matrix(revisions, summaries):
+    """Element count per product class (rows) and revision (columns), in timeline order."""
+    columns = {}
+    for revision, summary in zip(revisions, summaries):
+        if summary is not None:
+            columns[revision["label"]] = pd.Series(summary.component_count, dtype='int64')
+    if not columns:
+        return pd.DataFrame()
+    counts = pd.DataFrame(columns).fillna(0).astype('int64')
+    counts.index.name = "Class"
+    return counts.sort_index()
+
+
+def revision_changes(revisions):
+    """Added, removed and modified elements between each revision and the one before it.
+
+    Each step is diffed once and stored, so adding a revision only diffs it against its predecessor.
+    Also returns the steps that could not be diffed because the fingerprints of one of their
+    revisions were evicted from the store.
+    """
+    rows, missing = [], []
+    for old, new in zip(revisions, revisions[1:]):
+        step = f'{old["label"]} → {new["label"]}'
+        summary = load_diff_summary(old["file_hash"], new["file_hash"])
+        if summary is None:
+            missing.append(step)
+            continue
+        totals = summary[CHANGE_TYPES].sum()
+        rows.append({"Step": step, **{change: int(totals[change]) for change in CHANGE_TYPES}})
+    return pd.DataFrame(rows, columns=["Step"] + CHANGE_TYPES), missing
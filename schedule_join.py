@@ -0,0 +1,168 @@
+import numpy as np
+import pandas as pd
+
+JOIN_STATUSES = ["Matched", "Mismatched", "Only in schedule", "Only in model", "Duplicate key", "Missing key"]
+DEFAULT_RELATIVE_TOLERANCE = 1e-6
+MODEL_CONTEXT_COLUMNS = ["GlobalId", "Class", "Name"]
+# Pseudo model column holding the number of model objects behind a key, for schedules with a count column.
+OBJECT_COUNT_COLUMN = "Object count"
+
+
+def normalize_keys(values):
+    keys = pd.Series(np.asarray(values, dtype=object)).astype('string').str.strip()
+    return keys.mask(keys == '')
+
+
+class KeyIndex:
+    """Hash index over the join key of one table, built once and reused for every join against it.
+
+    Rows whose key is empty are kept aside. Keys that occur more than once are grouped:
+    on the model side, with keys such as Name or Type, a schedule row is matched against
+    all objects of its key together. Model objects without a key are not reported, since
+    most of a model would otherwise show up.
+    """
+
+    def __init__(self, frame, key):
+        self.key = key
+        self.length = len(frame)
+        keys = normalize_keys(frame[key])
+        missing = keys.isna().to_numpy()
+        duplicated = (keys.duplicated(keep=False).to_numpy()) & ~missing
+        unique = ~missing & ~duplicated
+        self.missing_rows = np.flatnonzero(missing)
+        self.duplicated_rows = np.flatnonzero(duplicated)
+        self.rows = np.flatnonzero(unique)
+        self.index = pd.Index(keys.to_numpy()[unique])
+        self.group_index = pd.Index(keys.iloc[self.duplicated_rows].unique())
+        # Group of each duplicated row, as a position in group_index.
+        self.group_codes = self.group_index.get_indexer(keys.iloc[self.duplicated_rows])
+        self.group_sizes = np.bincount(self.group_codes, minlength=len(self.group_index))
+        self.keys = keys
+
+
+def _take(frame, column, rows):
+    # np.asarray also densifies sparse pset columns.
+    return pd.Series(np.asarray(frame[column].iloc[rows], dtype=object))
+
+
+def _aggregate(frame, column, key_index, groups):
+    # One value per group: the sum if all values of the group are numbers, the common
+    # value if they are the same text, and None if they differ.
+    values = _take(frame, column, key_index.duplicated_rows)
+    numbers = pd.to_numeric(values, errors='coerce')
+    text = normalize_keys(values).str.casefold()
+    grouped = pd.DataFrame({
+        "value": values,
+        "number": numbers,
+        "text": text,
+        "not_numeric": (text.notna() & numbers.isna()).to_numpy(),
+    }).groupby(key_index.group_codes)
+    common = np.where(grouped["text"].nunique(dropna=False).to_numpy() == 1, grouped["value"].first().to_numpy(), None)
+    aggregated = np.where(grouped["not_numeric"].any().to_numpy(), common, grouped["number"].sum(min_count=1).to_numpy())
+    return aggregated[groups]
+
+
+def _model_values(objects, model_index, column, model_rows, groups):
+    if column == OBJECT_COUNT_COLUMN:
+        values = np.concatenate([np.ones(len(model_rows), dtype=np.int64), model_index.group_sizes[groups]])
+    else:
+        values = np.concatenate([np.asarray(_take(objects, column, model_rows)), _aggregate(objects, column, model_index, groups)])
+    return pd.Series(values.astype(object))
+
+
+def values_equal(left, right, rtol=DEFAULT_RELATIVE_TOLERANCE):
+    # Values that are numeric on both sides are compared with a relative tolerance, everything else as trimmed, case-insensitive text.
+    left_numeric = pd.to_numeric(left, errors='coerce')
+    right_numeric = pd.to_numeric(right, errors='coerce')
+    both_numeric = (left_numeric.notna() & right_numeric.notna()).to_numpy()
+    equal = np.isclose(left_numeric.fillna(0).to_numpy(dtype=float), right_numeric.fillna(0).to_numpy(dtype=float), rtol=rtol, atol=0)
+    text_rows = ~both_numeric
+    if text_rows.any():
+        left_text = normalize_keys(left[text_rows]).str.casefold().fillna('')
+        right_text = normalize_keys(right[text_rows]).str.casefold().fillna('')
+        equal[text_rows] = (left_text.to_numpy() == right_text.to_numpy())
+    return equal
+
+
+def _status_rows(status, key_index, rows, side):
+    return pd.DataFrame({
+        "Key": key_index.keys.iloc[rows].to_numpy(),
+        "Status": status,
+        "ScheduleRow": rows + 1 if side == 'schedule' else pd.NA,
+        "ModelRow": rows if side == 'model' else pd.NA,
+    })
+
+
+def join_schedule(schedule, schedule_index, objects, model_index, column_pairs=(), rtol=DEFAULT_RELATIVE_TOLERANCE):
+    """Join schedule rows to model objects on their key indexes and compare the paired columns.
+
+    column_pairs is a list of (schedule column, model column), where the model column
+    may be OBJECT_COUNT_COLUMN. A schedule row whose key occurs on several model objects
+    is compared with their aggregate from _aggregate. Returns one row per schedule row
+    and per unmatched model object with a Status from JOIN_STATUSES, the number of model
+    objects matched, the compared values of both sides and the names of the columns that differ.
+    """
+    positions = model_index.index.get_indexer(schedule_index.index)
+    matched = positions >= 0
+    unmatched_rows = schedule_index.rows[~matched]
+    groups = model_index.group_index.get_indexer(schedule_index.keys.iloc[unmatched_rows])
+    grouped = groups >= 0
+    groups = groups[grouped]
+    model_rows = model_index.rows[positions[matched]]
+    schedule_rows = np.concatenate([schedule_index.rows[matched], unmatched_rows[grouped]])
+    model_matched = np.zeros(len(model_index.rows), dtype=bool)
+    model_matched[positions[matched]] = True
+    group_matched = np.zeros(len(model_index.group_index), dtype=bool)
+    group_matched[groups] = True
+
+    # Aggregated matches have no single model row.
+    model_row_values = np.full(len(schedule_rows), pd.NA, dtype=object)
+    model_row_values[:len(model_rows)] = model_rows
+    joined = pd.DataFrame({
+        "Key": schedule_index.keys.iloc[schedule_rows].to_numpy(),
+        "Status": "Matched",
+        "ScheduleRow": schedule_rows + 1,
+        "ModelRow": model_row_values,
+        "Model objects": pd.array(np.concatenate([np.ones(len(model_rows), dtype=np.int64), model_index.group_sizes[groups]]), dtype='Int64'),
+    })
+    differences = np.zeros((len(joined), len(column_pairs)), dtype=bool)
+    for position, (schedule_column, model_column) in enumerate(column_pairs):
+        schedule_values = _take(schedule, schedule_column, schedule_rows)
+        model_values = _model_values(objects, model_index, model_column, model_rows, groups)
+        differences[:, position] = ~values_equal(schedule_values, model_values, rtol)
+        joined[f"{schedule_column} (schedule)"] = schedule_values
+        joined[f"{model_column} (model)"] = model_values
+    mismatched = differences.any(axis=1)
+    joined.loc[mismatched, "Status"] = "Mismatched"
+    pair_names = np.array([schedule_column for schedule_column, _ in column_pairs], dtype=object)
+    mismatched_columns = np.full(len(joined), '', dtype=object)
+    mismatched_columns[mismatched] = [', '.join(pair_names[row]) for row in differences[mismatched]]
+    joined["Mismatched columns"] = mismatched_columns
+
+    unmatched_model_rows = np.sort(np.concatenate([model_index.rows[~model_matched], model_index.duplicated_rows[~group_matched[model_index.group_codes]]]))
+    # Objects whose key is repeated in the schedule are listed, but not as missing from it.
+    schedule_duplicate_keys = schedule_index.keys.iloc[schedule_index.duplicated_rows].unique()
+    in_schedule = model_index.keys.iloc[unmatched_model_rows].isin(schedule_duplicate_keys).to_numpy()
+    result = pd.concat([
+        joined,
+        _status_rows("Only in schedule", schedule_index, unmatched_rows[~grouped], 'schedule'),
+        _status_rows("Duplicate key", schedule_index, schedule_index.duplicated_rows, 'schedule'),
+        _status_rows("Missing key", schedule_index, schedule_index.missing_rows, 'schedule'),
+        _status_rows("Only in model", model_index, unmatched_model_rows[~in_schedule], 'model'),
+        _status_rows("Duplicate key", model_index, unmatched_model_rows[in_schedule], 'model'),
+    ], ignore_index=True)
+
+    # Context from the model, so rows can be located without going back to the model table.
+    has_model_row = result["ModelRow"].notna().to_numpy()
+    model_row_positions = result.loc[has_model_row, "ModelRow"].to_numpy(dtype=np.int64)
+    for column in MODEL_CONTEXT_COLUMNS:
+        if column in objects.columns and column != model_index.key:
+            values = np.full(len(result), None, dtype=object)
+            values[has_model_row] = np.asarray(objects[column].iloc[model_row_positions], dtype=object)
+            result[column] = values
+    result["Status"] = pd.Categorical(result["Status"], categories=JOIN_STATUSES)
+    return result.drop(columns="ModelRow")
+
+
+def summarize_join(result):
+    return result["Status"].value_counts().reindex(JOIN_STATUSES, fill_value=0)
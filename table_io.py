@@ -0,0 +1,110 @@
+import os
+import shutil
+import tempfile
+
+import pandas as pd
+
+TABLE_FORMATS = ('csv', 'parquet')
+PARQUET_COMPRESSION = 'zstd'
+
+
+def _to_text(value):
+    if value is None or (isinstance(value, float) and value != value):
+        return None
+    return str(value)
+
+
+def make_parquet_safe(dataframe):
+    # Property values in IFC are loosely typed: one column can mix text, numbers, booleans and tuples.
+    # Arrow needs one type per column, so such columns are written as text.
+    converted = {}
+    for column in dataframe.columns:
+        series = dataframe[column]
+        if series.dtype == object and pd.api.types.infer_dtype(series, skipna=True) not in ('string', 'empty'):
+            converted[column] = series.map(_to_text).astype('string')
+    return dataframe.assign(**converted) if converted else dataframe
+
+
+def write_table(dataframe, path, table_format='csv'):
+    if table_format == 'csv':
+        dataframe.to_csv(path, index=False)
+    elif table_format == 'parquet':
+        make_parquet_safe(dataframe).to_parquet(path, index=False, compression=PARQUET_COMPRESSION)
+    else:
+        raise ValueError(f"Unsupported table format: {table_format}")
+    return path
+
+
+def _plain_columns(dataframe):
+    # Categorical columns become plain text so every chunk stores them with the same type.
+    converted = {column: dataframe[column].astype(object) for column in dataframe.columns if isinstance(dataframe[column].dtype, pd.CategoricalDtype)}
+    return dataframe.assign(**converted) if converted else dataframe
+
+
+def _unified_type(types):
+    import pyarrow as pa
+    types = {column_type for column_type in types if not pa.types.is_null(column_type)}
+    if len(types) == 1:
+        return types.pop()
+    if types and all(pa.types.is_integer(t) or pa.types.is_floating(t) for t in types):
+        return pa.float64()
+    if types and all(pa.types.is_boolean(t) for t in types):
+        return pa.bool_()
+    return pa.string()
+
+
+def _conform(table, schema):
+    import pyarrow as pa
+    columns = []
+    for field in schema:
+        if field.name in table.column_names:
+            column = table.column(field.name)
+            columns.append(column if column.type == field.type else column.cast(field.type))
+        else:
+            columns.append(pa.nulls(table.num_rows, field.type))
+    return pa.Table.from_arrays(columns, schema=schema)
+
+
+def write_table_stream(frames, path, table_format='csv', leading_columns=()):
+    """Write an iterable of DataFrame chunks to one CSV or Parquet file with bounded memory.
+
+    Chunks may have different columns and types. They are spooled to temporary
+    Parquet files first, and then written out with the union of all columns. The
+    column order is leading_columns, followed by the rest sorted by name. A column
+    keeps its type if it is the same in every chunk, becomes float64 if it mixes
+    integers and floats, and becomes text otherwise.
+    """
+    import pyarrow as pa
+    import pyarrow.csv
+    import pyarrow.parquet as pq
+
+    if table_format not in TABLE_FORMATS:
+        raise ValueError(f"Unsupported table format: {table_format}")
+    spool_dir = tempfile.mkdtemp(prefix='table-stream-', dir=os.path.dirname(os.path.abspath(path)))
+    try:
+        parts, column_types = [], {}
+        for frame in frames:
+            table = pa.Table.from_pandas(make_parquet_safe(_plain_columns(frame)), preserve_index=False)
+            for field in table.schema:
+                column_types.setdefault(field.name, set()).add(field.type)
+            part_path = os.path.join(spool_dir, f'{len(parts):06d}.parquet')
+            pq.write_table(table, part_path)
+            parts.append(part_path)
+
+        names = [column for column in leading_columns if column in column_types]
+        names += sorted(column for column in column_types if column not in names)
+        schema = pa.schema([(name, _unified_type(column_types[name])) for name in names])
+        if table_format == 'parquet':
+            writer = pq.ParquetWriter(path, schema, compression=PARQUET_COMPRESSION)
+        else:
+            writer = pyarrow.csv.CSVWriter(path, schema)
+        rows = 0
+        with writer:
+            for part_path in parts:
+                table = _conform(pq.read_table(part_path), schema)
+                writer.write_table(table)
+                rows += table.num_rows
+                os.remove(part_path)
+        return rows
+    finally:
+        shutil.rmtree(spool_dir, ignore_errors=True)
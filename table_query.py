@@ -0,0 +1,66 @@
+import numpy as np
+import pandas as pd
+
+FILTER_KINDS = ('contains', 'range', 'in')
+
+
+def dense_values(series):
+    if isinstance(series.dtype, pd.SparseDtype):
+        return series.sparse.to_dense()
+    return series
+
+
+def filter_mask(dataframe, filters):
+    """Boolean mask of the rows that pass every filter.
+
+    filters is a list of (column, kind, value): 'contains' matches text case-insensitively,
+    'range' keeps numbers within (minimum, maximum) where either bound may be None, and
+    'in' keeps rows whose value is one of value.
+    """
+    mask = np.ones(len(dataframe), dtype=bool)
+    for column, kind, value in filters:
+        series = dense_values(dataframe[column])
+        if kind == 'contains':
+            if not value:
+                continue
+            matches = series.astype('string').str.contains(value, case=False, regex=False, na=False)
+        elif kind == 'range':
+            minimum, maximum = value
+            numbers = pd.to_numeric(series, errors='coerce')
+            matches = numbers.notna()
+            if minimum is not None:
+                matches &= numbers >= minimum
+            if maximum is not None:
+                matches &= numbers <= maximum
+        elif kind == 'in':
+            if not value:
+                continue
+            matches = series.isin(value)
+        else:
+            raise ValueError(f"Unsupported filter: {kind}")
+        mask &= matches.to_numpy(dtype=bool)
+    return mask
+
+
+def sort_positions(dataframe, positions, sort_by, ascending=True):
+    values = pd.Series(np.asarray(dense_values(dataframe[sort_by]))[positions])
+    try:
+        order = values.sort_values(ascending=ascending, kind='stable', na_position='last').index.to_numpy()
+    except TypeError:
+        # Property columns can mix numbers and text; such columns are sorted as text.
+        order = values.astype('string').sort_values(ascending=ascending, kind='stable', na_position='last').index.to_numpy()
+    return positions[order]
+
+
+def query_positions(dataframe, filters=(), sort_by=None, ascending=True):
+    """Row positions of the filtered and sorted table, without copying any column."""
+    positions = np.flatnonzero(filter_mask(dataframe, filters))
+    if sort_by is not None:
+        positions = sort_positions(dataframe, positions, sort_by, ascending)
+    return positions
+
+
+def page_frame(dataframe, positions, columns, page, page_size):
+    """Dense copy of one page of the projected columns; pages are numbered from 1."""
+    page_positions = positions[(page - 1) * page_size:page * page_size]
+    return pd.DataFrame({column: np.asarray(dense_values(dataframe[column].iloc[page_positions])) for column in columns}, index=page_positions)
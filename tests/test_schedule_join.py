@@ -0,0 +1,35 @@
+import pandas as pd
+
+import schedule_join
+
+
+def _join(schedule, objects, key="GlobalId", column_pairs=()):
+    return schedule_join.join_schedule(
+        schedule, schedule_join.KeyIndex(schedule, key),
+        objects, schedule_join.KeyIndex(objects, key), column_pairs,
+    )
+
+
+def test_object_with_key_repeated_in_schedule_is_not_only_in_model():
+    schedule = pd.DataFrame({"GlobalId": ["g1", "g2", "gX", "g1"]})
+    objects = pd.DataFrame({"GlobalId": ["g1", "g2", "g3"], "Class": "IfcWall", "Name": ["A", "B", "C"]})
+
+    result = _join(schedule, objects)
+
+    statuses = result.groupby("Status", observed=True)["Key"].agg(sorted).to_dict()
+    assert statuses["Matched"] == ["g2"]
+    assert statuses["Only in schedule"] == ["gX"]
+    assert statuses["Only in model"] == ["g3"]
+    assert statuses["Duplicate key"] == ["g1", "g1", "g1"]
+    model_duplicate = result[(result["Status"] == "Duplicate key") & result["ScheduleRow"].isna()]
+    assert model_duplicate["Name"].tolist() == ["A"]
+
+
+def test_shared_model_key_is_compared_with_aggregate():
+    schedule = pd.DataFrame({"Name": ["W1"], "Volume": [3.0], "Count": [2]})
+    objects = pd.DataFrame({"GlobalId": ["a", "b"], "Class": "IfcWall", "Name": ["W1", "W1"], "Volume": [1.0, 2.0]})
+
+    result = _join(schedule, objects, "Name", [("Volume", "Volume"), ("Count", schedule_join.OBJECT_COUNT_COLUMN)])
+
+    assert result["Status"].tolist() == ["Matched"]
+    assert result["Model objects"].tolist() == [2]
@@ -0,0 +1,87 @@
+import contextvars
+import functools
+import json
+import logging
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from datetime import datetime, timezone
+
+import psutil
+
+TRACE_MAX_SPANS = 500
+
+trace_logger = logging.getLogger('ifc_tool.trace')
+_active_trace = contextvars.ContextVar('active_trace', default=None)
+_process = psutil.Process()
+
+
+class Trace:
+    """Bounded list of timed stages for one session."""
+
+    def __init__(self, session_id=None, max_spans=TRACE_MAX_SPANS):
+        self.session_id = session_id
+        self._spans = deque(maxlen=max_spans)
+        self._lock = threading.Lock()
+
+    def add(self, span):
+        with self._lock:
+            self._spans.append(span)
+
+    def spans(self):
+        with self._lock:
+            return list(self._spans)
+
+    def clear(self):
+        with self._lock:
+            self._spans.clear()
+
+    def to_json(self):
+        return json.dumps({"session_id": self.session_id, "spans": self.spans()}, indent=2, default=str)
+
+
+def activate_trace(trace):
+    # Spans recorded in this thread (one Streamlit script run) are added to trace.
+    _active_trace.set(trace)
+
+
+@contextmanager
+def trace_stage(stage, **details):
+    """Record wall time, thread CPU time and RSS change of the enclosed block."""
+    rss_before = _process.memory_info().rss
+    started_at = datetime.now(timezone.utc)
+    wall_started, cpu_started = time.perf_counter(), time.thread_time()
+    error = None
+    try:
+        yield details
+    except BaseException as e:
+        error = type(e).__name__
+        raise
+    finally:
+        rss_after = _process.memory_info().rss
+        trace = _active_trace.get()
+        span = {
+            "stage": stage,
+            "started_at": started_at.isoformat(timespec='milliseconds'),
+            "wall_ms": round((time.perf_counter() - wall_started) * 1000, 1),
+            "cpu_ms": round((time.thread_time() - cpu_started) * 1000, 1),
+            "rss_mb": round(rss_after / (1024 * 1024), 1),
+            "rss_delta_mb": round((rss_after - rss_before) / (1024 * 1024), 1),
+            "session_id": trace.session_id if trace else None,
+            "error": error,
+            **details,
+        }
+        trace_logger.info(json.dumps(span, default=str))
+        if trace is not None:
+            trace.add(span)
+
+
+def traced(stage):
+    def decorator(func):
+        @functools.wraps(func)
+        def wrapper(*args, **kwargs):
+            with trace_stage(stage):
+                return func(*args, **kwargs)
+        return wrapper
+    return decorator
@@ -1,33 +1,286 @@
 import streamlit as st
-import pandas as pd
-import ifcopenshell
+import hashlib
+import os
+import shutil
 import tempfile
+import threading
+import time
 import logging
+import uuid
+from collections import OrderedDict
+from contextlib import contextmanager
+from jobs import job_runner
+from model_cache import file_content_hash, remember_content_hash, forget_content_hash
+from tracing import trace_stage
+
 
 # Setup logging
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 
+SCRATCH_ROOT = os.environ.get('IFC_TOOL_SCRATCH_DIR', os.path.join(tempfile.gettempdir(), 'ifc_analysis_tool'))
+SCRATCH_MAX_AGE_SECONDS = int(os.environ.get('IFC_TOOL_SCRATCH_MAX_AGE_SECONDS', 6 * 60 * 60))
+JANITOR_INTERVAL_SECONDS = 10 * 60
+UPLOAD_CHUNK_SIZE = 8 * 1024 * 1024
+JOB_POLL_SECONDS = 1.0
+# Jobs that finish this quickly (e.g. results already in the analysis store) are shown without a progress bar.
+JOB_INLINE_WAIT_SECONDS = 0.3
+SESSION_JOB_LIMIT = 16
+TABLE_PAGE_SIZES = [50, 100, 500, 1000]
+TABLE_DEFAULT_COLUMNS = 50
+
+_janitor_lock = threading.Lock()
+_janitor_last_run = 0.0
+
+def session_scratch_dir():
+    scratch_dir = st.session_state.get('scratch_dir')
+    if not scratch_dir or not os.path.isdir(scratch_dir):
+        os.makedirs(SCRATCH_ROOT, exist_ok=True)
+        scratch_dir = tempfile.mkdtemp(prefix='session-', dir=SCRATCH_ROOT)
+        st.session_state.scratch_dir = scratch_dir
+    # The janitor only purges directories that have not been touched for SCRATCH_MAX_AGE_SECONDS.
+    os.utime(scratch_dir)
+    return scratch_dir
+
+def remove_file(file_path):
+    try:
+        os.remove(file_path)
+    except FileNotFoundError:
+        pass
+    except OSError as e:
+        logging.warning(f"Could not remove temporary file {file_path}: {e}")
+
+@contextmanager
+def scratch_file(suffix=''):
+    fd, file_path = tempfile.mkstemp(suffix=suffix, dir=session_scratch_dir())
+    os.close(fd)
+    try:
+        yield file_path
+    finally:
+        forget_content_hash(file_path)
+        remove_file(file_path)
+
+def copy_upload_to_file(uploaded_file, file_path, chunk_size=UPLOAD_CHUNK_SIZE):
+    digest = hashlib.sha256()
+    uploaded_file.seek(0)
+    with open(file_path, 'wb') as tmp_file:
+        for chunk in iter(lambda: uploaded_file.read(chunk_size), b''):
+            digest.update(chunk)
+            tmp_file.write(chunk)
+    return digest.hexdigest()
+
+@contextmanager
 def handle_file_upload(upload_type, file_types):
     uploaded_file = st.file_uploader(f"Choose a {upload_type} file", type=file_types, key=upload_type)
-    if uploaded_file:
-        with tempfile.NamedTemporaryFile(delete=False, suffix=f'.{file_types[0]}') as tmp_file:
-            tmp_file.write(uploaded_file.getvalue())
-            tmp_file_path = tmp_file.name
-        return tmp_file_path, uploaded_file.name
-    return None, None
-
-def process_ifc_file(file_path):
+    if not uploaded_file:
+        yield None, None
+        return
+    with scratch_file(suffix=f'.{file_types[0]}') as tmp_file_path:
+        with trace_stage("upload_copy", file=uploaded_file.name, bytes=uploaded_file.size):
+            remember_content_hash(tmp_file_path, copy_upload_to_file(uploaded_file, tmp_file_path))
+        yield tmp_file_path, uploaded_file.name
+
+def link_job_file(file_path):
+    # Upload scratch files are removed when the script run ends, but a job may outlive it.
+    job_file_path = os.path.join(session_scratch_dir(), f'job-{uuid.uuid4().hex}{os.path.splitext(file_path)[1]}')
     try:
-        return ifcopenshell.open(file_path)
-    except Exception as e:
-        error_message = f"Error opening IFC file: {e}"
+        os.link(file_path, job_file_path)
+    except OSError:
+        shutil.copyfile(file_path, job_file_path)
+    return job_file_path
+
+def _run_with_file(job, func, file_path, args):
+    try:
+        return func(job, file_path, *args)
+    finally:
+        remove_file(file_path)
+
+def _session_jobs():
+    if 'jobs' not in st.session_state:
+        st.session_state.jobs = OrderedDict()
+        st.session_state.cancelled_jobs = set()
+    return st.session_state.jobs
+
+def _forget_finished_jobs(jobs):
+    finished = [key for key, job in jobs.items() if job.finished]
+    for key in finished[:max(len(jobs) - SESSION_JOB_LIMIT, 0)]:
+        del jobs[key]
+
+def cancel_job(key):
+    job = _session_jobs().pop(key, None)
+    if job is not None:
+        job_runner.release(job)
+        st.session_state.cancelled_jobs.add(key)
+
+@st.fragment(run_every=JOB_POLL_SECONDS)
+def _job_progress(key):
+    job = _session_jobs().get(key)
+    if job is None or job.finished:
+        st.rerun()
+    st.progress(job.fraction or 0.0, text=job.progress_text())
+    if st.button("Cancel", key=f"cancel_{key}"):
+        cancel_job(key)
+        st.rerun()
+
+def run_file_job(key, description, file_path, func, *args):
+    """Run func(job, file_path, *args) on the background job runner and return its result.
+
+    Returns None until the job has finished. Meanwhile a progress bar with a Cancel
+    button is shown, and the page reruns when the job is done. The job is attached to
+    the session under key, so widget interactions do not restart or abort it.
+    """
+    jobs = _session_jobs()
+    if key in st.session_state.cancelled_jobs:
+        st.warning(f"{description} was cancelled.")
+        if st.button("Start again", key=f"restart_{key}"):
+            st.session_state.cancelled_jobs.discard(key)
+            st.rerun()
+        return None
+
+    job = jobs.get(key)
+    if job is None:
+        job = job_runner.attach(key) or job_runner.submit(key, description, _run_with_file, func, link_job_file(file_path), args)
+        jobs[key] = job
+        _forget_finished_jobs(jobs)
+        job.wait(JOB_INLINE_WAIT_SECONDS)
+    jobs.move_to_end(key)
+
+    if job.status == 'done':
+        return job.result
+    if job.status == 'failed':
+        error_message = f"{description} failed: {job.error}"
         logging.error(error_message)
         st.error(error_message)
+        if st.button("Retry", key=f"retry_{key}"):
+            del jobs[key]
+            st.rerun()
         return None
+    if job.status == 'cancelled':
+        del jobs[key]
+        st.session_state.cancelled_jobs.add(key)
+        st.rerun()
+    _job_progress(key)
+    return None
+
+def purge_orphaned_files(max_age_seconds=SCRATCH_MAX_AGE_SECONDS):
+    if not os.path.isdir(SCRATCH_ROOT):
+        return 0
+    cutoff = time.time() - max_age_seconds
+    purged = 0
+    for entry in os.scandir(SCRATCH_ROOT):
+        try:
+            if entry.stat(follow_symlinks=False).st_mtime >= cutoff:
+                continue
+            if entry.is_dir(follow_symlinks=False):
+                shutil.rmtree(entry.path, ignore_errors=True)
+            else:
+                os.remove(entry.path)
+            purged += 1
+        except OSError as e:
+            logging.warning(f"Could not purge {entry.path}: {e}")
+    if purged:
+        logging.info(f"Purged {purged} orphaned scratch entries from {SCRATCH_ROOT}")
+    return purged
+
+def run_janitor():
+    global _janitor_last_run
+    with _janitor_lock:
+        if time.time() - _janitor_last_run < JANITOR_INTERVAL_SECONDS:
+            return
+        _janitor_last_run = time.time()
+    purge_orphaned_files()
+
+def plotly_chart(fig, **kwargs):
+    # Serializing the figure into the page payload happens inside st.plotly_chart.
+    with trace_stage("plotly_chart", traces=len(fig.data)):
+        st.plotly_chart(fig, **kwargs)
+
+def _table_filters(dataframe, key):
+    import pandas as pd
+    filters = []
+    for column in st.multiselect("Filter by", dataframe.columns.tolist(), key=f"{key}_filter_columns"):
+        dtype = dataframe[column].dtype
+        if pd.api.types.is_numeric_dtype(dtype) and not pd.api.types.is_bool_dtype(dtype):
+            bounds = st.columns(2)
+            minimum = bounds[0].number_input(f"{column} from", value=None, key=f"{key}_min_{column}")
+            maximum = bounds[1].number_input(f"{column} to", value=None, key=f"{key}_max_{column}")
+            filters.append((column, 'range', (minimum, maximum)))
+        elif isinstance(dtype, pd.CategoricalDtype):
+            values = st.multiselect(f"{column} is one of", dtype.categories.tolist(), key=f"{key}_in_{column}")
+            filters.append((column, 'in', tuple(values)))
+        else:
+            text = st.text_input(f"{column} contains", key=f"{key}_contains_{column}")
+            filters.append((column, 'contains', text))
+    return filters
+
+def paginated_table(dataframe, key, data_version=None, columns=None):
+    """Show dataframe one page at a time; filtering, sorting and paging run on the server.
+
+    Only the visible page is sent to the browser. The filtered and sorted row order is
+    kept in the session under data_version, which must change whenever the table
+    contents do. Without a data_version the query runs on every rerun.
+    """
+    import table_query
+    if columns is None:
+        all_columns = dataframe.columns.tolist()
+        # Keyed by the column set: Streamlit would otherwise keep the selection made for a table with other columns.
+        column_set = hashlib.sha256('\0'.join(map(str, all_columns)).encode('utf-8')).hexdigest()[:12]
+        columns = st.multiselect("Columns to show", all_columns, default=all_columns[:TABLE_DEFAULT_COLUMNS], key=f"{key}_columns_{column_set}")
+        if len(all_columns) > TABLE_DEFAULT_COLUMNS:
+            st.caption(f"{len(all_columns)} columns in total; add more under 'Columns to show'.")
+    with st.expander("Filter and sort"):
+        filters = _table_filters(dataframe, key)
+        sort_column, order_column = st.columns([3, 1])
+        sort_by = sort_column.selectbox("Sort by", [None] + dataframe.columns.tolist(), format_func=lambda column: "(table order)" if column is None else column, key=f"{key}_sort_by")
+        ascending = order_column.radio("Order", ["Ascending", "Descending"], key=f"{key}_order") == "Ascending"
+
+    # Only cached under an explicit version: ids of freed DataFrames are reused for new ones.
+    signature = (data_version, len(dataframe), tuple(filters), sort_by, ascending)
+    cached = st.session_state.get(f"{key}_query") if data_version is not None else None
+    if cached is not None and cached[0] == signature:
+        positions = cached[1]
+    else:
+        with trace_stage("table_query", rows=len(dataframe), filters=len(filters), sorted=sort_by is not None) as span:
+            positions = table_query.query_positions(dataframe, filters, sort_by, ascending)
+            span["matches"] = len(positions)
+        if data_version is not None:
+            st.session_state[f"{key}_query"] = (signature, positions)
 
-def read_excel(file):
+    size_column, page_column, info_column = st.columns([1, 1, 2])
+    page_size = size_column.selectbox("Rows per page", TABLE_PAGE_SIZES, index=1, key=f"{key}_page_size")
+    page_count = max((len(positions) + page_size - 1) // page_size, 1)
+    # The page count is part of the widget key, so a new filter starts again at page 1.
+    page = page_column.number_input(f"Page (of {page_count:,})", min_value=1, max_value=page_count, value=1, step=1, key=f"{key}_page_{page_count}")
+    first_row = (page - 1) * page_size
+    info_column.write(f"Rows {min(first_row + 1, len(positions)):,}–{min(first_row + page_size, len(positions)):,} of {len(positions):,}" + (f" (filtered from {len(dataframe):,})" if len(positions) != len(dataframe) else ""))
+    st.dataframe(table_query.page_frame(dataframe, positions, columns, page, page_size))
+
+def read_excel_layout(file):
+    import excel_ingest
     try:
-        return pd.read_excel(file, engine='openpyxl')
+        return excel_ingest.read_layout(file, file_content_hash(file))
+    except Exception as e:
+        error_message = f"Failed to read Excel file: {e}"
+        logging.error(error_message)
+        st.error(error_message)
+        return {}
+
+def read_excel(file, sheet_name=None, columns=None):
+    import pandas as pd
+    import excel_ingest
+    try:
+        if sheet_name is None:
+            sheet_name = next(iter(excel_ingest.read_layout(file, file_content_hash(file))))
+        progress_bar = st.progress(0.0, text="Reading Excel file...")
+
+        def report_progress(rows_read, total_rows):
+            fraction = min(rows_read / total_rows, 1.0) if total_rows else 0.0
+            progress_bar.progress(fraction, text=f"Read {rows_read:,} of {total_rows:,} rows" if total_rows else f"Read {rows_read:,} rows")
+
+        with trace_stage("read_excel", sheet=sheet_name, columns=len(columns or [])) as span:
+            df = excel_ingest.load_sheet(file, file_content_hash(file), sheet_name, columns, report_progress)
+            span["rows"] = len(df)
+        progress_bar.empty()
+        return df
     except Exception as e:
         error_message = f"Failed to read Excel file: {e}"
         logging.error(error_message)